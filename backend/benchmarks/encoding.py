@@ -0,0 +1,92 @@
+"""
+Benchmark of generation response encodings.
+Builds realistic generated apps (the real scaffold plus replayed or synthetic
+component code) and measures, for JSON and MessagePack bodies, the payload
+size and encode/decode time with no compression, gzip and brotli.
+
+Without --cassettes, apps are generated from deterministic synthetic LLM
+responses; pass a directory recorded from the real providers
+(LLM_CASSETTE_MODE=record) to measure real component code instead.
+
+Usage: python benchmarks/encoding.py --sizes small medium large
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import utils, classes and the pipeline benchmark helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.pipeline import OUTLINES, SyntheticChatModel, build_outline, emit, use_cassettes
+from utils.pipeline import generate_app
+from utils.encoding import brotli, msgpack, compress, serialize
+
+
+def decompress(body, encoding):
+    if encoding == "br":
+        return brotli.decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+def deserialize(body, body_format):
+    if body_format == "msgpack":
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def median_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.percentile(samples, 50) * 1000
+
+
+def bench_encodings(app, iterations):
+    formats = ["json"] + (["msgpack"] if msgpack else [])
+    encodings = [None, "gzip"] + (["br"] if brotli else [])
+    baseline = len(serialize(app, "json")[0])
+    for body_format in formats:
+        for encoding in encodings:
+            body = compress(serialize(app, body_format)[0], encoding)
+            encode = median_ms(lambda: compress(serialize(app, body_format)[0], encoding), iterations)
+            decode = median_ms(lambda: deserialize(decompress(body, encoding), body_format), iterations)
+            name = f"{body_format}+{encoding or 'identity'}"
+            emit(f"{name:>18}: {len(body) / 1024:9.1f} KiB ({len(body) / baseline:6.1%}) | "
+                 f"encode p50 {encode:8.3f} ms | decode p50 {decode:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payload size and encode time of generation responses")
+    parser.add_argument("--cassettes", help="Replay recorded LLM responses from this directory instead of synthetic ones")
+    parser.add_argument("--sizes", nargs="+", default=list(OUTLINES), choices=list(OUTLINES), help="Outline sizes to run")
+    parser.add_argument("--iterations", type=int, default=20, help="Encode/decode runs per combination")
+    args = parser.parse_args()
+
+    if not msgpack or not brotli:
+        emit("msgpack and/or brotli not installed; their rows are skipped")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.cassettes:
+            use_cassettes(args.cassettes, "replay")
+        else:
+            use_cassettes(directory, "record", SyntheticChatModel())
+
+        for size in args.sizes:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                app = asyncio.run(generate_app(build_outline(size)))
+            emit(f"\n== {size}: {len(app['files'])} files ==")
+            bench_encodings(app, args.iterations)
@@ -0,0 +1,395 @@
+"""
+Offline benchmark of the generation pipeline.
+Replays recorded LLM responses (cassettes) so only our own code is timed:
+prompt building, response parsing, page assembly, the semantic cache and
+full pipeline runs, across small, medium and large outlines.
+
+Cassettes recorded from the real providers (LLM_CASSETTE_MODE=record) are
+replayed as-is; --synthesize first fills the cassette directory with
+deterministic synthetic responses so the suite runs without API keys.
+
+Usage: python benchmarks/pipeline.py --synthesize --iterations 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import utils and classes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# The provider clients are built at import time; replay never reaches them
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+import utils.call_ai as call_ai
+import utils.call_gemini as call_gemini
+from classes.llm_cassette import LLMCassette
+from utils.json_stream import ObjectStreamParser
+from utils.pipeline import run_pipeline, generate_app, PIPELINE_PROFILES
+from utils.designer_agent import DESIGNER_SYSTEM_PROMPT, build_design_prompt, generate_design_async
+from utils.project_manager_agent import PROJECT_MANAGER_SYSTEM_PROMPT, build_project_prompt, manage_project_async
+from utils.planner_agent import build_planner_prompt, parse_plan, plan_website_async
+from utils.component_specs_agent import build_component_specs_prompt, parse_component_specs, generate_component_specs_async
+from utils.component_gen_agent import (
+    build_batch_component_prompt, assemble_page_with_types, merge_file_groups, generate_page_files,
+    generate_root_layout, clean_code,
+)
+
+
+SECTIONS = [
+    ("Hero", "Headline, subheading and primary call to action"),
+    ("Features", "Grid of product features with icons"),
+    ("Pricing", "Three pricing tiers with a monthly/yearly toggle"),
+    ("Testimonials", "Carousel of customer quotes"),
+    ("FAQ", "Accordion of frequently asked questions"),
+    ("Contact", "Contact form with validation"),
+    ("Team", "Team member cards with social links"),
+    ("Blog Preview", "Latest three blog posts"),
+    ("Newsletter", "Email signup with success state"),
+    ("Stats", "Animated key metrics"),
+    ("Integrations", "Logos of supported integrations"),
+    ("Case Studies", "Customer success stories with results"),
+    ("Roadmap", "Timeline of upcoming releases"),
+    ("Careers", "Open positions list with filters"),
+    ("Partners", "Partner program overview"),
+    ("Security", "Compliance badges and security practices"),
+    ("Docs Links", "Quick links into the documentation"),
+    ("Changelog", "Recent product updates"),
+    ("Community", "Forum and social community links"),
+    ("Footer", "Site map, legal links and social icons"),
+]
+
+OUTLINES = {
+    "small": 3,
+    "medium": 8,
+    "large": 20,
+}
+
+SECTIONS_PER_PAGE = 4
+
+
+def build_outline(size):
+    return [{"sectionName": name, "description": description} for name, description in SECTIONS[:OUTLINES[size]]]
+
+
+def to_kebab(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def decode_after(text, marker):
+    """Decode the JSON document that follows marker in a prompt."""
+    start = text.index(marker) + len(marker)
+    start += len(text[start:]) - len(text[start:].lstrip())
+    return json.JSONDecoder().raw_decode(text, start)[0]
+
+
+class SyntheticChatModel:
+    """
+    Deterministic stand-in for the providers, answering each agent's prompt with
+    schema-valid JSON derived from the prompt itself. Only used to seed cassettes.
+    """
+
+    def respond(self, messages):
+        system, prompt = messages[0].content, messages[-1].content
+        if system == DESIGNER_SYSTEM_PROMPT:
+            return self.design()
+        if system == PROJECT_MANAGER_SYSTEM_PROMPT:
+            return self.project(decode_after(prompt, "Initial Outline:"))
+        if "componentSpecs[route]" in prompt:
+            return self.plan_specs(decode_after(prompt, "Input outline:"))
+        if "Input outline:" in prompt:
+            return self.plan(decode_after(prompt, "Input outline:"))
+        if "Input structure:" in prompt:
+            return self.specs(decode_after(prompt, "Input structure:"))
+        return self.components(decode_after(prompt, "Components to generate (with their specs):"))
+
+    def invoke(self, messages):
+        return AIMessage(content=self.respond(messages))
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+    async def astream(self, messages, chunk_size=256):
+        text = self.respond(messages)
+        for start in range(0, len(text), chunk_size):
+            yield AIMessageChunk(content=text[start:start + chunk_size])
+
+    def design(self):
+        return json.dumps({
+            "theme": {
+                "mode": "dark", "primaryColor": "#6366f1", "secondaryColor": "#22d3ee", "radius": "lg",
+                "spacing": "comfortable", "typography": "modern", "layoutStyle": "centered",
+                "animationLevel": "subtle", "colorPalette": {"background": "#0b0f19", "foreground": "#f8fafc"},
+            },
+            "designPrinciples": ["Clarity", "Consistency", "Contrast"],
+            "componentGuidelines": {"buttons": "Rounded with subtle glow"},
+            "modernPatterns": ["Glassmorphism cards", "Gradient headings"],
+        })
+
+    def project(self, outline):
+        return json.dumps({
+            "scope": {
+                "complexity": "moderate" if len(outline) < 10 else "complex",
+                "priorityFeatures": [section["sectionName"] for section in outline[:3]],
+                "optionalFeatures": [section["sectionName"] for section in outline[3:]],
+            },
+            "recommendedPages": ["/"] + [f"/{to_kebab(section['sectionName'])}" for section in outline[SECTIONS_PER_PAGE::SECTIONS_PER_PAGE]],
+            "componentPriorities": {to_kebab(section["sectionName"]): "high" for section in outline[:3]},
+        })
+
+    def plan(self, outline):
+        pages = []
+        for start in range(0, len(outline), SECTIONS_PER_PAGE):
+            chunk = outline[start:start + SECTIONS_PER_PAGE]
+            route = "/" if start == 0 else f"/{to_kebab(chunk[0]['sectionName'])}"
+            pages.append({
+                "route": route,
+                "title": chunk[0]["sectionName"],
+                "sections": [
+                    {"id": to_kebab(section["sectionName"]), "sectionName": section["sectionName"], "type": "section", "dependencies": []}
+                    for section in chunk
+                ],
+            })
+        theme = {"mode": "light", "primaryColor": "blue", "radius": "md", "spacing": "comfortable"}
+        return json.dumps({"theme": theme, "pages": pages})
+
+    def specs(self, structure):
+        return json.dumps({
+            page["route"]: {
+                section["id"]: {
+                    "name": section["sectionName"],
+                    "type": section["type"],
+                    "props": ["title", "description", "items"],
+                    "state": {"isOpen": False},
+                    "libraries": ["lucide-react"],
+                    "usage": f"{section['sectionName']} section of the {page['title']} page",
+                }
+                for section in page["sections"]
+            }
+            for page in structure["pages"]
+        })
+
+    def plan_specs(self, outline):
+        plan = json.loads(self.plan(outline))
+        return json.dumps({**plan, "componentSpecs": json.loads(self.specs(plan))})
+
+    def components(self, spec_list):
+        code = {}
+        for entry in spec_list:
+            name = "".join(word.capitalize() for word in entry["id"].split("-"))
+            items = "\n".join(
+                f'        <li key="{i}" className="rounded-lg border p-4">{entry["spec"]["name"]} item {i}</li>' for i in range(12)
+            )
+            code[entry["id"]] = f"""'use client'
+
+import {{ useState }} from 'react'
+import {{ Button }} from '@/components/ui/button'
+
+export default function {name}() {{
+  const [isOpen, setIsOpen] = useState(false)
+  return (
+    <section className="py-16">
+      <h2 className="text-3xl font-bold">{entry["spec"]["name"]}</h2>
+      <Button onClick={{() => setIsOpen(!isOpen)}}>Toggle</Button>
+      <ul className="grid gap-4 md:grid-cols-3">
+{items}
+      </ul>
+    </section>
+  )
+}}
+"""
+        return json.dumps(code)
+
+
+def use_cassettes(directory, mode, llm=None):
+    for module in (call_ai, call_gemini):
+        module.client.cassette = LLMCassette(directory, mode)
+        if llm is not None:
+            module.client.llm = llm
+
+
+def emit(line):
+    print(line, file=sys.__stdout__, flush=True)
+
+
+def report(name, samples):
+    samples = np.array(samples) * 1000
+    emit(f"{name:>34}: p50 {np.percentile(samples, 50):9.3f} ms | p95 {np.percentile(samples, 95):9.3f} ms | n={len(samples)}")
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run_chain(outline):
+    """Replay the agent chain once and return every intermediate artifact."""
+    requirement = "User-provided outline"
+    design = await generate_design_async(requirement, outline)
+    project = await manage_project_async(requirement, outline, design)
+    theme, pages = await plan_website_async(outline, design, project, requirement)
+    specs = await generate_component_specs_async({"theme": theme, "pages": pages})
+    return requirement, design, project, theme, pages, specs
+
+
+async def bench_pipeline(outline, iterations, profile):
+    """
+    Full replayed runs, timing each stage from the previous stage boundary to its
+    progress event. The events' own elapsed is rounded to milliseconds, too coarse
+    for replayed stages; with concurrent stages this is each one's share of the critical path.
+    """
+    stages = {}
+    totals = []
+    for _ in range(iterations):
+        start = boundary = time.perf_counter()
+        async for event, data in run_pipeline(outline, profile=profile):
+            if event == "stage":
+                now = time.perf_counter()
+                stages.setdefault(data["stage"], []).append(now - boundary)
+                boundary = now
+        totals.append(time.perf_counter() - start)
+    for stage, samples in stages.items():
+        report(f"{profile} stage {stage}", samples)
+    report(f"{profile} total", totals)
+
+
+def bench_prompts(outline, artifacts, iterations):
+    requirement, design, project, theme, pages, specs = artifacts
+    report("prompt designer", time_calls(lambda: build_design_prompt(requirement, outline), iterations))
+    report("prompt project_manager", time_calls(lambda: build_project_prompt(requirement, outline, design), iterations))
+    report("prompt planner", time_calls(lambda: build_planner_prompt(outline, design, project, requirement), iterations))
+    report("prompt component_specs", time_calls(lambda: build_component_specs_prompt({"theme": theme, "pages": pages}), iterations))
+    spec_lists = [
+        (route, [{"id": comp_id, "spec": spec} for comp_id, spec in components.items()])
+        for route, components in specs.items()
+    ]
+    report("prompt components (all pages)", time_calls(
+        lambda: [build_batch_component_prompt(spec_list, theme, route) for route, spec_list in spec_lists], iterations
+    ))
+
+
+def bench_parsing(outline, artifacts, iterations):
+    requirement, design, project, theme, pages, specs = artifacts
+    model = SyntheticChatModel()
+    plan_response = model.plan(outline)
+    specs_response = model.specs({"theme": theme, "pages": pages})
+    component_responses = [
+        model.components([{"id": comp_id, "spec": spec} for comp_id, spec in components.items()])
+        for components in specs.values()
+    ]
+    report("parse planner", time_calls(lambda: parse_plan(plan_response, design), iterations))
+    report("parse component_specs", time_calls(lambda: parse_component_specs(specs_response), iterations))
+    report("parse components (all pages)", time_calls(
+        lambda: [[clean_code(code) for code in json.loads(response).values()] for response in component_responses], iterations
+    ))
+
+    def parse_streamed():
+        for response in component_responses:
+            stream_parser = ObjectStreamParser()
+            for start in range(0, len(response), 256):
+                stream_parser.feed(response[start:start + 256])
+
+    report("stream-parse components (all pages)", time_calls(parse_streamed, iterations))
+
+
+def bench_assembly(artifacts, iterations):
+    requirement, design, project, theme, pages, specs = artifacts
+    groups = asyncio.run(gather_pages(specs, theme))
+
+    def assemble():
+        layout = {}
+        generate_root_layout(layout, theme)
+        for route, components in specs.items():
+            assemble_page_with_types(route, components)
+        merge_file_groups({"scaffold": layout, **groups}, specs)
+
+    report("assemble pages + merge", time_calls(assemble, iterations))
+
+
+async def gather_pages(specs, theme):
+    results = await asyncio.gather(*(generate_page_files(route, components, theme) for route, components in specs.items()))
+    return dict(zip(specs, results))
+
+
+def bench_cache(artifacts, iterations):
+    """Semantic cache with the local vector backend; skipped when the embedding model can't load."""
+    from classes.cache import SemanticCache
+    from utils.component_cache import component_cache_key, component_cache_namespace
+
+    requirement, design, project, theme, pages, specs = artifacts
+    cache = SemanticCache(redisHost="localhost", redisPort=6379, backend="local")
+    try:
+        cache.warmUp()
+    except Exception as e:
+        emit(f"{'cache':>34}: skipped, embedding model unavailable ({e})")
+        return
+    if not cache.status()["modelLoaded"]:
+        emit(f"{'cache':>34}: skipped, embedding model unavailable")
+        return
+
+    namespace = component_cache_namespace(theme)
+    keys = [component_cache_key(spec) for components in specs.values() for spec in components.values()]
+    report("cache save (all components)", time_calls(
+        lambda: [cache.saveToCache(key, "code", namespace=namespace) for key in keys], 1
+    ))
+    report("cache exact hits (all components)", time_calls(
+        lambda: [cache.semanticLookup(key, namespace=namespace) for key in keys], iterations
+    ))
+    cache.exactCache.clear()
+    report("cache semantic (all components)", time_calls(
+        lambda: [cache.semanticLookup(f"{key} variant", namespace=namespace) for key in keys], iterations
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the generation pipeline")
+    parser.add_argument("--cassettes", default=str(Path(__file__).parent / "cassettes"), help="Cassette directory")
+    parser.add_argument("--synthesize", action="store_true", help="Seed the cassettes with synthetic responses first")
+    parser.add_argument("--sizes", nargs="+", default=list(OUTLINES), choices=list(OUTLINES), help="Outline sizes to run")
+    parser.add_argument("--profiles", nargs="+", default=["parallel"], choices=list(PIPELINE_PROFILES), help="Pipeline profiles to compare")
+    parser.add_argument("--iterations", type=int, default=5, help="Full pipeline runs per size")
+    parser.add_argument("--micro-iterations", type=int, default=200, help="Calls per micro-benchmark")
+    parser.add_argument("--skip-cache", action="store_true", help="Don't benchmark the semantic cache")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        # Pipeline runs plus the sequential chain record every prompt the suite replays
+        use_cassettes(args.cassettes, "record", SyntheticChatModel())
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for size in args.sizes:
+                asyncio.run(run_chain(build_outline(size)))
+                for profile in args.profiles:
+                    asyncio.run(generate_app(build_outline(size), profile=profile))
+
+    use_cassettes(args.cassettes, "replay")
+
+    # The agents' progress prints would dominate the timings, so results go straight to the real stdout
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for size in args.sizes:
+            outline = build_outline(size)
+            artifacts = asyncio.run(run_chain(outline))
+            specs = artifacts[5]
+            emit(f"\n== {size}: {len(outline)} sections, {len(specs)} pages, "
+                 f"{sum(len(components) for components in specs.values())} components ==")
+            for profile in args.profiles:
+                asyncio.run(bench_pipeline(outline, args.iterations, profile))
+            bench_prompts(outline, artifacts, args.micro_iterations)
+            bench_parsing(outline, artifacts, args.micro_iterations)
+            bench_assembly(artifacts, args.micro_iterations)
+            if not args.skip_cache:
+                bench_cache(artifacts, max(1, args.micro_iterations // 20))
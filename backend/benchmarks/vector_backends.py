@@ -0,0 +1,69 @@
+"""
+Benchmark the SemanticCache vector backends against each other.
+Inserts random unit vectors and times add and top-k search for the local
+NumPy index and, when Redis Stack is reachable, the RediSearch HNSW index.
+
+Usage: python benchmarks/vector_backends.py --rows 10000 --queries 500
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import classes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from classes.vector_backends import LocalVectorBackend, RedisVectorBackend
+
+
+def random_vectors(count, dim, seed):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((count, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def bench_backend(backend, rows, queries, k):
+    namespace = "bench"
+    backend.ensureIndex()
+
+    start = time.perf_counter()
+    for i, vec in enumerate(rows):
+        backend.add(namespace, f"topic {i}", vec.tobytes(), "{}", ttl=600)
+    add_seconds = time.perf_counter() - start
+
+    latencies = []
+    for vec in queries:
+        start = time.perf_counter()
+        backend.search(namespace, vec.tobytes(), k)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies) * 1000
+    print(f"{backend.name:>6}: add {len(rows) / add_seconds:,.0f} rows/s | "
+          f"search p50 {np.percentile(latencies, 50):.3f} ms, p95 {np.percentile(latencies, 95):.3f} ms, "
+          f"p99 {np.percentile(latencies, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SemanticCache vector backends")
+    parser.add_argument("--rows", type=int, default=10000, help="Vectors to insert")
+    parser.add_argument("--queries", type=int, default=500, help="Searches to time")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("-k", type=int, default=3, help="Neighbours per search")
+    parser.add_argument("--skip-redis", action="store_true", help="Only benchmark the local backend")
+    args = parser.parse_args()
+
+    rows = random_vectors(args.rows, args.dim, seed=1)
+    queries = random_vectors(args.queries, args.dim, seed=2)
+
+    bench_backend(LocalVectorBackend(dim=args.dim), rows, queries, args.k)
+
+    if not args.skip_redis:
+        # Own index name and "bench" namespace keep results apart from real cache entries
+        redis_backend = RedisVectorBackend(indexName="benchVectorIndex", dim=args.dim)
+        if redis_backend.supportsSearch():
+            bench_backend(redis_backend, rows, queries, args.k)
+        else:
+            print(" redis: skipped, Redis Stack not reachable")
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+APP_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ArtifactStore:
+    """
+    Content-addressed on-disk store for generated apps.
+
+    Every file is written once under `<directory>/blobs/<ab>/<sha256>`, so files
+    shared between generations (scaffold, unchanged components) are stored once.
+    An app is its manifest, a path → hash mapping saved as
+    `<directory>/apps/<appId>.json`, where appId is the hash of the manifest
+    itself; the same app always gets the same id and its files never change.
+    Safe to share between workers: every write is a rename of a complete file.
+    """
+
+    def __init__(self, directory: str = "artifacts"):
+        self.directory = Path(directory)
+
+    @classmethod
+    def fromEnv(cls) -> "ArtifactStore":
+        return cls(os.environ.get("ARTIFACT_STORE_DIR", "artifacts"))
+
+    @staticmethod
+    def hashContent(content: str) -> str:
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def blobPath(self, fileHash: str) -> Path:
+        return self.directory / "blobs" / fileHash[:2] / fileHash
+
+    def manifestPath(self, appId: str) -> Path:
+        return self.directory / "apps" / f"{appId}.json"
+
+    def writeAtomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent writers and readers never see a half-written file.
+        # saveApp runs in several threads per worker, so the temp name must be unique per call
+        tmpPath = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmpPath.write_bytes(data)
+            os.replace(tmpPath, path)
+        except OSError:
+            # Paths are content-addressed: a target another writer already put in place is just as good
+            if not path.exists():
+                raise
+        finally:
+            tmpPath.unlink(missing_ok=True)
+
+    def saveApp(self, files: dict) -> tuple:
+        """Store an app's files; returns (appId, manifest). Blobs already on disk are not rewritten."""
+        manifest = {}
+        for path, content in files.items():
+            fileHash = self.hashContent(content)
+            manifest[path] = fileHash
+            blobPath = self.blobPath(fileHash)
+            if not blobPath.exists():
+                self.writeAtomic(blobPath, content.encode())
+
+        manifestJson = json.dumps(manifest, sort_keys=True, separators=(",", ":"))
+        appId = self.hashContent(manifestJson)
+        manifestPath = self.manifestPath(appId)
+        if not manifestPath.exists():
+            self.writeAtomic(manifestPath, manifestJson.encode())
+        # Keep the caller's file order, which is page order, rather than sorted
+        return appId, manifest
+
+    def getManifest(self, appId: str) -> Optional[dict]:
+        if not APP_ID_PATTERN.match(appId):
+            return None
+        try:
+            return json.loads(self.manifestPath(appId).read_text())
+        except FileNotFoundError:
+            return None
+
+    def fileBlob(self, appId: str, path: str) -> Optional[tuple]:
+        """(hash, blob path) of one file of an app, or None if the app or file is unknown."""
+        manifest = self.getManifest(appId)
+        if manifest is None or path not in manifest:
+            return None
+        fileHash = manifest[path]
+        return fileHash, self.blobPath(fileHash)
+
+    def readFile(self, fileHash: str) -> str:
+        return self.blobPath(fileHash).read_text()
+
+    def readApp(self, manifest: dict) -> dict:
+        """An app's files, path → content, in manifest order."""
+        return {path: self.readFile(fileHash) for path, fileHash in manifest.items()}
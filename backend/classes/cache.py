@@ -1,40 +1,143 @@
 from typing import Callable, Optional, Any
-import redis
-from redis.commands.search.field import VectorField, TextField
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import uuid
+from classes.embedding_batcher import EmbeddingBatcher
+from classes.vector_backends import VectorBackend, RedisVectorBackend, LocalVectorBackend
+from utils.metrics import observe_cache_lookup
 import json
 import re
 import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 
 class SemanticCache:
     def __init__(
         self,
         redisHost: str = "localhost",
         redisPort: int = 6379,
-        indexName: str = "outlineIndex",
+        # Index holds every stage's entries, separated by the namespace tag
+        indexName: str = "semanticCacheIndex",
         vectorField: str = "embedding",
         topicField: str = "topic",
         outputField: str = "output",
+        namespaceField: str = "namespace",
         modelName: str = "sentence-transformers/all-MiniLM-L6-v2",
         dim: int = 384,
-        distanceMetric: str = "COSINE"
+        distanceMetric: str = "COSINE",
+        exactCacheSize: int = 1024,
+        embedBatchSize: int = 32,
+        embedBatchWaitMs: float = 5.0,
+        lazy: bool = True,
+        indexRetrySeconds: float = 30.0,
+        # "redis", "local", "auto" (redis if Redis Stack is reachable, else local) or a VectorBackend
+        backend: Any = "redis",
+        snapshotPath: Optional[str] = None,
+        redisMaxConnections: int = 50,
+        redisSocketTimeout: float = 5.0
     ):
-        print("init: connecting to redis")
-        self.r = redis.Redis(host=redisHost, port=redisPort, decode_responses=False)
-        self.indexName = indexName
-        self.vectorField = vectorField
-        self.topicField = topicField
-        self.outputField = outputField
         self.dim = dim
-        self.distanceMetric = distanceMetric
-        print("init: loading embedding model")
-        self.model = SentenceTransformer(modelName)
-        print("init: creating index")
-        self.initIndex()
+        self.backendChoice = backend
+        self.snapshotPath = snapshotPath
+        self.redisOptions = dict(
+            redisHost=redisHost,
+            redisPort=redisPort,
+            indexName=indexName,
+            vectorField=vectorField,
+            topicField=topicField,
+            outputField=outputField,
+            namespaceField=namespaceField,
+            dim=dim,
+            distanceMetric=distanceMetric,
+            maxConnections=redisMaxConnections,
+            socketTimeout=redisSocketTimeout,
+        )
+        self.backendLock = threading.Lock()
+        self._backend: Optional[VectorBackend] = None
+        # In-process LRU of exact matches: key -> (expiresAt or None, outputJson)
+        self.exactCacheSize = exactCacheSize
+        self.exactCache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.exactLock = threading.Lock()
+        # Concurrent embed() calls are grouped into one batched encode
+        self.batcher = EmbeddingBatcher(self.embedMany, maxBatchSize=embedBatchSize, maxWaitMs=embedBatchWaitMs) if embedBatchWaitMs > 0 else None
+        # Model and index are set up on first use (or by warmUp) so startup stays fast
+        self.modelName = modelName
+        self._model = None
+        self.modelLock = threading.Lock()
+        self.indexReady = False
+        self.indexCheckedAt: Optional[float] = None
+        self.indexRetrySeconds = indexRetrySeconds
+        self.indexLock = threading.Lock()
+        if not lazy:
+            self.warmUp()
         print("init: ready")
 
+    @property
+    def backend(self) -> VectorBackend:
+        if self._backend is None:
+            with self.backendLock:
+                if self._backend is None:
+                    self._backend = self.createBackend(self.backendChoice)
+                    print(f"backend: using {self._backend.name} vector backend")
+        return self._backend
+
+    def createBackend(self, choice: Any) -> VectorBackend:
+        if isinstance(choice, VectorBackend):
+            return choice
+        if choice == "local":
+            return LocalVectorBackend(dim=self.dim, snapshotPath=self.snapshotPath)
+        redisBackend = RedisVectorBackend(**self.redisOptions)
+        if choice == "auto" and not redisBackend.supportsSearch():
+            print("backend: Redis Stack unavailable, falling back to local vector index")
+            return LocalVectorBackend(dim=self.dim, snapshotPath=self.snapshotPath)
+        return redisBackend
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self.modelLock:
+                if self._model is None:
+                    print(f"model: loading embedding model {self.modelName}")
+                    # Imported here because sentence_transformers pulls in torch, which is slow to import
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.modelName)
+                    print("model: loaded")
+        return self._model
+
+    def ensureIndex(self) -> bool:
+        if self.indexReady:
+            return True
+        with self.indexLock:
+            now = time.time()
+            if self.indexReady or (self.indexCheckedAt and now - self.indexCheckedAt < self.indexRetrySeconds):
+                return self.indexReady
+            self.indexCheckedAt = now
+            self.indexReady = self.backend.ensureIndex()
+        return self.indexReady
+
+    def warmUp(self):
+        """Load the model, create the index and run one encode so the first request doesn't pay for it."""
+        print("warmUp: starting")
+        start = time.time()
+        self.embedMany(["warm up"])
+        self.ensureIndex()
+        print(f"warmUp: done in {time.time() - start:.2f}s, indexReady={self.indexReady}")
+
+    def status(self) -> dict:
+        backendOk = self.backend.ping()
+        return {
+            "backend": self.backend.name,
+            "modelLoaded": self._model is not None,
+            "indexReady": self.indexReady,
+            "backendReachable": backendOk,
+            "ready": self._model is not None and self.indexReady and backendOk,
+        }
+
+    def snapshot(self, path: Optional[str] = None):
+        """Persist the local vector index to disk (no-op for the shared Redis backend)."""
+        if isinstance(self.backend, LocalVectorBackend):
+            self.backend.snapshot(path)
+
     def normalizeTopic(self, text: str) -> str:
         print(f"normalizeTopic: raw={text}")
         t = text.lower().strip()
@@ -50,99 +153,222 @@ class SemanticCache:
         print(f"normalizeTopic: normalized={t}")
         return t
 
+    def embedMany(self, texts: list) -> list:
+        print(f"embedMany: encoding {len(texts)} texts")
+        vecs = self.model.encode(texts, batch_size=max(len(texts), 1), convert_to_numpy=True).astype(np.float32)
+        return [vec.tobytes() for vec in vecs]
+
     def embed(self, text: str) -> bytes:
         print(f"embed: encoding text={text}")
-        # Simple single-pass encoding for better semantic matching
-        vec = self.model.encode([text], convert_to_numpy=True)[0].astype(np.float32)
-        print("embed: embedding generated")
-        return vec.tobytes()
+        if self.batcher is not None:
+            return self.batcher.embed(text)
+        return self.embedMany([text])[0]
+
+    async def embedAsync(self, text: str) -> bytes:
+        print(f"embedAsync: encoding text={text}")
+        if self.batcher is not None:
+            return await asyncio.wrap_future(self.batcher.submit(text))
+        return (await asyncio.to_thread(self.embedMany, [text]))[0]
+
+    async def ensureIndexAsync(self) -> bool:
+        if self.indexReady:
+            return True
+        return await asyncio.to_thread(self.ensureIndex)
+
+    def exactKey(self, namespace: str, norm: str) -> str:
+        return f"exact:{namespace}:{hashlib.sha256(norm.encode()).hexdigest()}"
+
+    def decodeOutput(self, outBytes: Any) -> Any:
+        try:
+            return json.loads(outBytes)
+        except Exception:
+            try:
+                return outBytes.decode()
+            except Exception:
+                return outBytes
+
+    def rememberExact(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        expiresAt = time.time() + ttl if ttl else None
+        with self.exactLock:
+            self.exactCache[key] = (expiresAt, outputJson)
+            self.exactCache.move_to_end(key)
+            while len(self.exactCache) > self.exactCacheSize:
+                self.exactCache.popitem(last=False)
+
+    def localExactLookup(self, key: str) -> Optional[Any]:
+        with self.exactLock:
+            entry = self.exactCache.get(key)
+            if entry is not None:
+                expiresAt, outputJson = entry
+                if expiresAt is None or expiresAt > time.time():
+                    self.exactCache.move_to_end(key)
+                    print("exactLookup: ✓ in-process hit")
+                    return json.loads(outputJson)
+                del self.exactCache[key]
+        return None
+
+    def sharedExactHit(self, key: str, entry: Optional[tuple]) -> Optional[Any]:
+        if entry is None:
+            return None
+        print("exactLookup: ✓ shared backend hit")
+        outputJson, remainingTtl = entry
+        self.rememberExact(key, outputJson, remainingTtl)
+        return self.decodeOutput(outputJson)
+
+    def exactLookup(self, namespace: str, norm: str) -> Optional[Any]:
+        """Check the in-process LRU, then the backend's shared key, for a byte-identical normalized topic."""
+        key = self.exactKey(namespace, norm)
+        local = self.localExactLookup(key)
+        if local is not None:
+            return local
+
+        try:
+            entry = self.backend.getExact(key)
+        except Exception as e:
+            print(f"exactLookup: backend get failed error={e}")
+            return None
+        return self.sharedExactHit(key, entry)
+
+    async def exactLookupAsync(self, namespace: str, norm: str) -> Optional[Any]:
+        key = self.exactKey(namespace, norm)
+        local = self.localExactLookup(key)
+        if local is not None:
+            return local
 
-    def initIndex(self):
-        print("initIndex: attempting index creation")
         try:
-            schema = [
-                VectorField(
-                    self.vectorField,
-                    "HNSW",
-                    {
-                        "TYPE": "FLOAT32",
-                        "DIM": self.dim,
-                        "DISTANCE_METRIC": self.distanceMetric,
-                    }
-                ),
-                TextField(self.topicField)
-            ]
-            self.r.ft(self.indexName).create_index(schema)
-            print("initIndex: new index created")
+            entry = await self.backend.getExactAsync(key)
         except Exception as e:
-            print(f"initIndex: index exists or failed, ignoring. error={e}")
+            print(f"exactLookup: backend get failed error={e}")
+            return None
+        return self.sharedExactHit(key, entry)
 
-    def semanticLookup(self, query: str, threshold: float = 0.75, k: int = 3) -> Optional[Any]:
-        print(f"semanticLookup: query={query}")
+    def semanticLookup(self, query: str, threshold: float = 0.75, k: int = 3, namespace: str = "outline") -> Optional[Any]:
+        print(f"semanticLookup: namespace={namespace}, query={query}")
+        lookupStart = time.perf_counter()
         norm = self.normalizeTopic(query)
-        qvec = self.embed(norm)
 
-        knnQuery = f"*=>[KNN {k} @{self.vectorField} $vec AS score]"
-        params = {"vec": qvec}
+        # Fast path: identical normalized topics skip embedding and vector search
+        exact = self.exactLookup(namespace, norm)
+        if exact is not None:
+            observe_cache_lookup(namespace, "exact", lookupStart)
+            return exact
+
+        if not self.ensureIndex():
+            print("semanticLookup: index unavailable, miss")
+            observe_cache_lookup(namespace, "miss", lookupStart)
+            return None
+
+        qvec = self.embed(norm)
 
         try:
-            from redis.commands.search.query import Query
-            q = Query(knnQuery).return_fields(self.topicField, self.outputField, "score").sort_by("score").dialect(2)
-            res = self.r.ft(self.indexName).search(q, query_params=params)
+            hits = self.backend.search(namespace, qvec, k)
         except Exception as e:
             print(f"semanticLookup: search failed error={e}")
+            observe_cache_lookup(namespace, "miss", lookupStart)
             return None
 
-        if len(res.docs) == 0:
+        result = self.pickBest(hits, threshold, k)
+        observe_cache_lookup(namespace, "semantic" if result is not None else "miss", lookupStart)
+        return result
+
+    async def semanticLookupAsync(self, query: str, threshold: float = 0.75, k: int = 3, namespace: str = "outline") -> Optional[Any]:
+        """Non-blocking semanticLookup: async backend I/O, embedding via the batcher thread."""
+        print(f"semanticLookupAsync: namespace={namespace}, query={query}")
+        lookupStart = time.perf_counter()
+        norm = self.normalizeTopic(query)
+
+        exact = await self.exactLookupAsync(namespace, norm)
+        if exact is not None:
+            observe_cache_lookup(namespace, "exact", lookupStart)
+            return exact
+
+        if not await self.ensureIndexAsync():
+            print("semanticLookupAsync: index unavailable, miss")
+            observe_cache_lookup(namespace, "miss", lookupStart)
+            return None
+
+        qvec = await self.embedAsync(norm)
+
+        try:
+            hits = await self.backend.searchAsync(namespace, qvec, k)
+        except Exception as e:
+            print(f"semanticLookupAsync: search failed error={e}")
+            observe_cache_lookup(namespace, "miss", lookupStart)
+            return None
+
+        result = self.pickBest(hits, threshold, k)
+        observe_cache_lookup(namespace, "semantic" if result is not None else "miss", lookupStart)
+        return result
+
+    def pickBest(self, hits: list, threshold: float, k: int) -> Optional[Any]:
+        if len(hits) == 0:
             print("semanticLookup: no docs found")
             return None
 
         # Show top results for debugging
-        for i, doc in enumerate(res.docs[:k]):
-            rawScore = float(doc.score)
-            similarity = 1 - rawScore
-            cachedTopic = getattr(doc, self.topicField, "N/A").decode() if isinstance(getattr(doc, self.topicField, b""), bytes) else getattr(doc, self.topicField, "N/A")
-            print(f"  Result {i+1}: similarity={similarity:.4f}, topic='{cachedTopic}'")
+        for i, hit in enumerate(hits[:k]):
+            print(f"  Result {i+1}: similarity={hit['similarity']:.4f}, topic='{hit['topic']}'")
 
         # Use best match
-        doc = res.docs[0]
-        rawScore = float(doc.score)
-        similarity = 1 - rawScore
-        print(f"semanticLookup: best match - rawScore={rawScore:.4f}, similarity={similarity:.4f}, threshold={threshold}")
+        best = hits[0]
+        similarity = best["similarity"]
+        print(f"semanticLookup: best match - similarity={similarity:.4f}, threshold={threshold}")
 
         if similarity >= threshold:
             print("semanticLookup: ✓ similarity threshold met, returning cached")
-            outBytes = getattr(doc, self.outputField)
-            try:
-                return json.loads(outBytes)
-            except Exception:
-                try:
-                    return outBytes.decode()
-                except Exception:
-                    return outBytes
+            return self.decodeOutput(best["output"])
 
         print(f"semanticLookup: ✗ below threshold (need {threshold}, got {similarity:.4f}), miss")
         return None
 
-    def saveToCache(self, topic: str, output: Any, ttl: Optional[int] = None):
-        print(f"saveToCache: saving topic={topic}")
+    def saveToCache(self, topic: str, output: Any, ttl: Optional[int] = None, namespace: str = "outline"):
+        print(f"saveToCache: saving namespace={namespace}, topic={topic}")
         norm = self.normalizeTopic(topic)
+        outputJson = json.dumps(output)
+
+        if not self.ensureIndex():
+            print("saveToCache: index unavailable, keeping exact match in process only")
+            self.rememberExact(self.exactKey(namespace, norm), outputJson, ttl)
+            return
+
         vec = self.embed(norm)
-        key = f"outline:{uuid.uuid4().hex}"
+        exactKey = self.exactKey(namespace, norm)
+        # Vector entry, TTL and shared exact-match key are written together
+        self.backend.add(namespace, norm, vec, outputJson, ttl, exactKey=exactKey)
+        self.rememberExact(exactKey, outputJson, ttl)
+
+    async def saveToCacheAsync(self, topic: str, output: Any, ttl: Optional[int] = None, namespace: str = "outline"):
+        print(f"saveToCacheAsync: saving namespace={namespace}, topic={topic}")
+        norm = self.normalizeTopic(topic)
         outputJson = json.dumps(output)
+        exactKey = self.exactKey(namespace, norm)
 
-        mapping = {
-            self.topicField: norm,
-            self.outputField: outputJson,
-            self.vectorField: vec
-        }
+        if not await self.ensureIndexAsync():
+            print("saveToCacheAsync: index unavailable, keeping exact match in process only")
+            self.rememberExact(exactKey, outputJson, ttl)
+            return
 
-        self.r.hset(key, mapping=mapping)
-        print(f"saveToCache: saved with key={key}")
+        vec = await self.embedAsync(norm)
+        await self.backend.addAsync(namespace, norm, vec, outputJson, ttl, exactKey=exactKey)
+        self.rememberExact(exactKey, outputJson, ttl)
 
-        if ttl:
-            self.r.expire(key, ttl)
-            print(f"saveToCache: ttl applied {ttl}")
+    async def exactOnlyLookupAsync(self, key: str, namespace: str) -> Optional[Any]:
+        """Exact lookup of an already-canonical key, without normalizeTopic or embedding."""
+        lookupStart = time.perf_counter()
+        exact = await self.exactLookupAsync(namespace, key)
+        observe_cache_lookup(namespace, "exact" if exact is not None else "miss", lookupStart)
+        return exact
+
+    async def saveExactAsync(self, key: str, output: Any, ttl: Optional[int] = None, namespace: str = "outline"):
+        """Store an exact-only entry: shared exact-match key, no vector."""
+        print(f"saveExactAsync: saving namespace={namespace}")
+        outputJson = json.dumps(output)
+        exactKey = self.exactKey(namespace, key)
+        self.rememberExact(exactKey, outputJson, ttl)
+        try:
+            await self.backend.setExactAsync(exactKey, outputJson, ttl)
+        except Exception as e:
+            print(f"saveExactAsync: backend unavailable, keeping exact match in process only. error={e}")
 
     def getOrGenerate(
         self,
@@ -150,10 +376,11 @@ class SemanticCache:
         generatorFn: Callable[[], Any],
         threshold: float = 0.70,
         ttl: Optional[int] = None,
-        k: int = 3
+        k: int = 3,
+        namespace: str = "outline"
     ) -> Any:
         print(f"getOrGenerate: topic={topic}")
-        cached = self.semanticLookup(topic, threshold=threshold, k=k)
+        cached = self.semanticLookup(topic, threshold=threshold, k=k, namespace=namespace)
 
         if cached is not None:
             print("getOrGenerate: cache hit")
@@ -168,6 +395,52 @@ class SemanticCache:
         except Exception:
             out = result
 
-        self.saveToCache(topic, out, ttl=ttl)
+        self.saveToCache(topic, out, ttl=ttl, namespace=namespace)
         print("getOrGenerate: new result cached")
         return out
+
+    async def getOrGenerateAsync(
+        self,
+        topic: str,
+        generatorFn: Callable[[], Any],
+        threshold: float = 0.70,
+        ttl: Optional[int] = None,
+        k: int = 3,
+        namespace: str = "outline",
+        exactOnly: bool = False
+    ) -> Any:
+        """
+        Async version of getOrGenerate. generatorFn is a coroutine function; cache
+        lookups and writes never block the event loop, and cache failures fall back to generating.
+
+        exactOnly skips normalization and KNN matching: only the identical key hits.
+        Use it for keys built from structured inputs, where texts that embed alike
+        (shared prefixes past the model's input limit, one changed item in ten)
+        still need different outputs.
+        """
+        print(f"getOrGenerateAsync: namespace={namespace}, topic={topic}")
+        try:
+            if exactOnly:
+                cached = await self.exactOnlyLookupAsync(topic, namespace)
+            else:
+                cached = await self.semanticLookupAsync(topic, threshold, k, namespace)
+        except Exception as e:
+            print(f"getOrGenerateAsync: lookup failed, generating. error={e}")
+            cached = None
+
+        if cached is not None:
+            print("getOrGenerateAsync: cache hit")
+            return cached
+
+        print("getOrGenerateAsync: cache miss, generating")
+        result = await generatorFn()
+
+        try:
+            if exactOnly:
+                await self.saveExactAsync(topic, result, ttl, namespace)
+            else:
+                await self.saveToCacheAsync(topic, result, ttl, namespace)
+            print("getOrGenerateAsync: new result cached")
+        except Exception as e:
+            print(f"getOrGenerateAsync: save failed, ignoring. error={e}")
+        return result
@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches embedding requests across threads.
+
+    Requests that arrive within maxWaitMs of the first one in a batch are encoded
+    together with a single encodeFn(texts) call, and every caller gets back the
+    vector for its own text. Identical texts in a batch are only encoded once.
+    """
+
+    def __init__(
+        self,
+        encodeFn: Callable[[List[str]], List[Any]],
+        maxBatchSize: int = 32,
+        maxWaitMs: float = 5.0
+    ):
+        self.encodeFn = encodeFn
+        self.maxBatchSize = maxBatchSize
+        self.maxWait = maxWaitMs / 1000.0
+        self.requests: "queue.Queue[tuple]" = queue.Queue()
+        self.thread = None
+        self.startLock = threading.Lock()
+
+    def start(self):
+        with self.startLock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="embedding-batcher", daemon=True)
+                self.thread.start()
+
+    def submit(self, text: str) -> Future:
+        self.start()
+        future: Future = Future()
+        self.requests.put((text, future))
+        return future
+
+    def embed(self, text: str) -> Any:
+        return self.submit(text).result()
+
+    def collectBatch(self) -> list:
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.maxWait
+        while len(batch) < self.maxBatchSize:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        # The only batcher thread; nothing may escape the loop or every later embed hangs
+        while True:
+            batch = []
+            try:
+                batch = self.collectBatch()
+                self.encodeBatch(batch)
+            except Exception as e:
+                print(f"⚠ EmbeddingBatcher: batch failed. error={e}")
+                for _, future in batch:
+                    self.settle(future, error=e)
+
+    def encodeBatch(self, batch: list):
+        # Callers that were cancelled while queued (embedAsync cancels the future with its task) are skipped
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(texts, self.encodeFn(texts)))
+        except Exception as e:
+            for _, future in batch:
+                self.settle(future, error=e)
+            return
+        print(f"EmbeddingBatcher: encoded {len(texts)} texts for {len(batch)} requests")
+        for text, future in batch:
+            self.settle(future, result=vectors[text])
+
+    @staticmethod
+    def settle(future: Future, result: Any = None, error: Exception = None):
+        """Resolve a future unless it is already done or cancelled."""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
@@ -0,0 +1,44 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from classes.artifact_store import ArtifactStore
+
+
+class GenerationStore:
+    """
+    Keeps the artifacts of recent generations (outline, design, PM plan, website plan,
+    component specs and files) so an edited outline can be regenerated incrementally.
+    Bounded LRU; the oldest generations are dropped first. Files are not held in
+    memory: they go to the ArtifactStore and the record keeps its appId and manifest.
+    """
+
+    def __init__(self, maxGenerations: int = 200, artifacts: Optional[ArtifactStore] = None):
+        self.maxGenerations = maxGenerations
+        self.artifacts = artifacts or ArtifactStore.fromEnv()
+        self.generations: "OrderedDict[str, dict]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def save(self, record: dict) -> str:
+        """Store a generation record; its "files" are replaced by "appId" and "manifest". Writes to disk."""
+        generationId = uuid.uuid4().hex
+        if "files" in record:
+            appId, manifest = self.artifacts.saveApp(record["files"])
+            record = {key: value for key, value in record.items() if key != "files"}
+            record.update(appId=appId, manifest=manifest)
+        record = {**record, "id": generationId, "createdAt": time.time()}
+        with self.lock:
+            self.generations[generationId] = record
+            while len(self.generations) > self.maxGenerations:
+                self.generations.popitem(last=False)
+        print(f"save: stored generation={generationId}, total={len(self.generations)}")
+        return generationId
+
+    def get(self, generationId: str) -> Optional[dict]:
+        with self.lock:
+            record = self.generations.get(generationId)
+            if record is not None:
+                self.generations.move_to_end(generationId)
+            return record
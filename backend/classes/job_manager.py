@@ -0,0 +1,156 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Optional
+
+from classes.artifact_store import ArtifactStore
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, jobId: str, payload: dict):
+        self.id = jobId
+        self.payload = payload
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.timings: dict = {}
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.createdAt = time.time()
+        self.startedAt: Optional[float] = None
+        self.finishedAt: Optional[float] = None
+
+    def toDict(self) -> dict:
+        now = time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "timings": self.timings,
+            "error": self.error,
+            "createdAt": self.createdAt,
+            "startedAt": self.startedAt,
+            "finishedAt": self.finishedAt,
+            "queuedSeconds": round((self.startedAt or now) - self.createdAt, 3),
+            "runSeconds": round((self.finishedAt or now) - self.startedAt, 3) if self.startedAt else None,
+        }
+
+
+class JobManager:
+    """
+    Runs generations in the background on a fixed-size pool of asyncio workers.
+
+    runPipeline is called with the job payload as keyword arguments and must return
+    an async iterator of (event, data) tuples, as utils.pipeline.run_pipeline does.
+    With an ArtifactStore, finished jobs keep the appId and manifest of their
+    result instead of its files, so up to maxJobs results don't pin every app in memory.
+    """
+
+    def __init__(
+        self,
+        runPipeline: Callable[..., AsyncIterator],
+        workerCount: int = 2,
+        queueSize: int = 100,
+        maxJobs: int = 500,
+        artifacts: Optional[ArtifactStore] = None
+    ):
+        self.runPipeline = runPipeline
+        self.artifacts = artifacts
+        self.workerCount = workerCount
+        self.maxJobs = maxJobs
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queueSize)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.workers: list = []
+
+    def start(self):
+        print(f"JobManager: starting {self.workerCount} workers")
+        for i in range(self.workerCount):
+            self.workers.append(asyncio.create_task(self.workerLoop(i)))
+
+    async def stop(self):
+        print("JobManager: stopping workers")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, payload: dict) -> Job:
+        job = Job(uuid.uuid4().hex, payload)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"job queue is full ({self.queue.maxsize} pending)")
+        self.jobs[job.id] = job
+        self.pruneJobs()
+        print(f"submit: queued job={job.id}, pending={self.queue.qsize()}")
+        return job
+
+    def getJob(self, jobId: str) -> Optional[Job]:
+        return self.jobs.get(jobId)
+
+    def pruneJobs(self):
+        # Drop the oldest finished jobs once we hold more than maxJobs
+        if len(self.jobs) <= self.maxJobs:
+            return
+        for jobId in list(self.jobs.keys()):
+            if len(self.jobs) <= self.maxJobs:
+                break
+            if self.jobs[jobId].status in ("completed", "failed"):
+                del self.jobs[jobId]
+
+    def nextStage(self, stages: list, completedStage: str) -> Optional[str]:
+        if completedStage in stages:
+            idx = stages.index(completedStage)
+            if idx + 1 < len(stages):
+                return stages[idx + 1]
+        return None
+
+    async def storeResult(self, result: dict) -> dict:
+        if self.artifacts is None or "files" not in result:
+            return result
+        appId, manifest = await asyncio.to_thread(self.artifacts.saveApp, result["files"])
+        result = {key: value for key, value in result.items() if key != "files"}
+        return {**result, "appId": appId, "manifest": manifest}
+
+    async def workerLoop(self, workerId: int):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.runJob(job, workerId)
+            finally:
+                self.queue.task_done()
+
+    async def runJob(self, job: Job, workerId: int):
+        print(f"runJob: worker={workerId} starting job={job.id}")
+        job.status = "running"
+        job.startedAt = time.time()
+        stages: list = []
+        try:
+            async for event, data in self.runPipeline(**job.payload):
+                if event == "start":
+                    stages = data.get("stages", [])
+                    job.stage = stages[0] if stages else None
+                elif event == "stages":
+                    # Revised stage list (e.g. a fallback path); the current stage is unchanged
+                    stages = data.get("stages", stages)
+                elif event == "stage":
+                    job.timings[data["stage"]] = data.get("elapsed")
+                    job.stage = self.nextStage(stages, data["stage"])
+                elif event == "done":
+                    job.result = await self.storeResult(data)
+            job.status = "completed"
+            print(f"runJob: job={job.id} completed")
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"runJob: job={job.id} failed error={e}")
+        finally:
+            job.finishedAt = time.time()
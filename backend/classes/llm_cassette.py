@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+
+
+class CassetteMiss(LookupError):
+    """Replay mode found no recording for a prompt."""
+
+
+class LLMCassette:
+    """
+    Records LLM prompt → response pairs to disk and replays them deterministically.
+
+    One JSON file per call under `<directory>/<provider>/<sha256>.json`, keyed by
+    the provider and the exact message list (roles and content). Modes:
+      - "record": always call the provider and save the response
+      - "replay": only serve recordings; a missing one raises CassetteMiss
+      - "auto": replay when a recording exists, otherwise call and record
+    """
+
+    MODES = ("record", "replay", "auto")
+
+    def __init__(self, directory: str, mode: str = "auto"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {self.MODES}")
+        self.directory = Path(directory)
+        self.mode = mode
+
+    @classmethod
+    def fromEnv(cls) -> Optional["LLMCassette"]:
+        """LLM_CASSETTE_MODE=record|replay|auto with LLM_CASSETTE_DIR; None when unset or "off"."""
+        mode = os.environ.get("LLM_CASSETTE_MODE", "off")
+        if mode == "off":
+            return None
+        return cls(os.environ.get("LLM_CASSETTE_DIR", "cassettes"), mode)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode in ("replay", "auto")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode in ("record", "auto")
+
+    @staticmethod
+    def serializeMessages(messages) -> list:
+        return [{"role": message.type, "content": message.content} for message in messages]
+
+    def key(self, provider: str, messages) -> str:
+        payload = json.dumps([provider, self.serializeMessages(messages)], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, provider: str, messages) -> Path:
+        return self.directory / provider / f"{self.key(provider, messages)}.json"
+
+    def play(self, provider: str, messages) -> Optional[AIMessage]:
+        """Recorded response for these messages, or None when not replaying or not recorded."""
+        if not self.replaying:
+            return None
+        path = self.path(provider, messages)
+        if not path.exists():
+            if self.mode == "replay":
+                raise CassetteMiss(f"No {provider} recording at {path}")
+            return None
+        entry = json.loads(path.read_text())
+        return AIMessage(content=entry["response"], usage_metadata=entry.get("usage"))
+
+    def record(self, provider: str, messages, response):
+        if not self.recording:
+            return
+        path = self.path(provider, messages)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "provider": provider,
+            "messages": self.serializeMessages(messages),
+            "response": response.content,
+            "usage": getattr(response, "usage_metadata", None),
+        }
+        # Write then rename so concurrent recorders never leave a half-written file;
+        # the temp name is unique per call since one worker records from several threads
+        tmpPath = path.with_suffix(f".{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        tmpPath.write_text(json.dumps(entry, indent=2))
+        os.replace(tmpPath, path)
@@ -0,0 +1,242 @@
+import asyncio
+import random
+import threading
+import time
+from langchain_core.messages import AIMessage
+from utils.metrics import observe_llm_call
+
+
+# HTTP statuses worth retrying: rate limited, request timeout, and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exception class names that signal a transient network problem, across provider SDKs
+RETRYABLE_ERROR_NAMES = ("Timeout", "Connection", "RateLimit", "ServiceUnavailable", "InternalServer", "ResourceExhausted")
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by sync and async callers.
+    Refills at `ratePerSecond` up to `capacity`; acquiring waits until a token is available.
+    """
+
+    def __init__(self, ratePerSecond: float, capacity: float):
+        self.ratePerSecond = ratePerSecond
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updatedAt = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens, going into debt if needed; returns how long to wait before proceeding."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updatedAt) * self.ratePerSecond)
+            self.updatedAt = now
+            self.tokens -= cost
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.ratePerSecond
+
+    def acquire(self, cost: float = 1.0):
+        wait = self.reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquireAsync(self, cost: float = 1.0):
+        wait = self.reserve(cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class LLMCallTimeout(TimeoutError):
+    """An LLM call exceeded its per-call timeout."""
+
+
+class LLMClient:
+    """
+    Shared wrapper around one LangChain chat model per provider.
+
+    Every call goes through the provider's token bucket, gets a per-call timeout
+    and is retried with jittered exponential backoff on rate limits, 5xx responses,
+    timeouts and connection errors. The underlying model (and its HTTP connection
+    pool) is created once and reused by every caller. With a cassette, recorded
+    responses are served without touching the provider and new ones are saved.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        llm,
+        requestsPerMinute: float = 30,
+        burst: float = None,
+        maxRetries: int = 4,
+        baseDelay: float = 1.0,
+        maxDelay: float = 30.0,
+        timeout: float = 120.0,
+        cassette=None,
+    ):
+        self.name = name
+        self.llm = llm
+        self.bucket = TokenBucket(requestsPerMinute / 60.0, burst or max(1.0, requestsPerMinute / 10.0))
+        self.maxRetries = maxRetries
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.timeout = timeout
+        self.cassette = cassette
+
+    @staticmethod
+    def statusCode(error):
+        for attr in ("status_code", "code"):
+            value = getattr(error, attr, None)
+            if isinstance(value, int):
+                return value
+        response = getattr(error, "response", None)
+        value = getattr(response, "status_code", None)
+        return value if isinstance(value, int) else None
+
+    def isRetryable(self, error) -> bool:
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+            return True
+        status = self.statusCode(error)
+        if status is not None:
+            return status in RETRYABLE_STATUS_CODES
+        errorName = type(error).__name__
+        return any(name in errorName for name in RETRYABLE_ERROR_NAMES)
+
+    def retryAfter(self, error):
+        """Server-provided Retry-After in seconds, if any."""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def backoffDelay(self, attempt: int, error=None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.maxDelay, self.baseDelay * (2 ** attempt)))
+        retryAfter = self.retryAfter(error)
+        if retryAfter is not None:
+            delay = max(delay, min(retryAfter, self.maxDelay))
+        return delay
+
+    def invoke(self, messages):
+        """Blocking call; the timeout is enforced by the provider client."""
+        started = time.perf_counter()
+        recorded = self.cassette.play(self.name, messages) if self.cassette else None
+        if recorded is not None:
+            observe_llm_call(self.name, messages, recorded, time.perf_counter() - started, 0, "replay")
+            return recorded
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = self.llm.invoke(messages)
+                observe_llm_call(self.name, messages, response, time.perf_counter() - started, attempt, "ok")
+                if self.cassette:
+                    self.cassette.record(self.name, messages, response)
+                return response
+            except Exception as e:
+                if attempt >= self.maxRetries or not self.isRetryable(e):
+                    observe_llm_call(self.name, messages, None, time.perf_counter() - started, attempt, "error")
+                    raise
+                delay = self.backoffDelay(attempt, e)
+                attempt += 1
+                print(f"⚠ {self.name} call failed ({type(e).__name__}: {e}), retry {attempt}/{self.maxRetries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def ainvoke(self, messages, timeout: float = None):
+        """Async call with a hard per-call timeout around each attempt."""
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        recorded = self.cassette.play(self.name, messages) if self.cassette else None
+        if recorded is not None:
+            observe_llm_call(self.name, messages, recorded, time.perf_counter() - started, 0, "replay")
+            return recorded
+
+        attempt = 0
+        while True:
+            await self.bucket.acquireAsync()
+            try:
+                try:
+                    response = await asyncio.wait_for(self.llm.ainvoke(messages), timeout)
+                except asyncio.TimeoutError:
+                    raise LLMCallTimeout(f"{self.name} call timed out after {timeout:g}s")
+                observe_llm_call(self.name, messages, response, time.perf_counter() - started, attempt, "ok")
+                if self.cassette:
+                    self.cassette.record(self.name, messages, response)
+                return response
+            except Exception as e:
+                if attempt >= self.maxRetries or not self.isRetryable(e):
+                    observe_llm_call(self.name, messages, None, time.perf_counter() - started, attempt, "error")
+                    raise
+                delay = self.backoffDelay(attempt, e)
+                attempt += 1
+                print(f"⚠ {self.name} call failed ({type(e).__name__}: {e}), retry {attempt}/{self.maxRetries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def chunkText(chunk) -> str:
+        """Text of a streamed message chunk; some providers send a list of content blocks."""
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        return "".join(
+            block if isinstance(block, str) else block.get("text", "")
+            for block in content
+            if isinstance(block, str) or block.get("type") == "text"
+        )
+
+    async def astream(self, messages, timeout: float = None):
+        """
+        Stream the response text chunk by chunk. The timeout is a deadline for the
+        whole response; retries only happen before the first chunk has been yielded.
+        """
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        recorded = self.cassette.play(self.name, messages) if self.cassette else None
+        if recorded is not None:
+            observe_llm_call(self.name, messages, recorded, time.perf_counter() - started, 0, "replay")
+            yield recorded.content
+            return
+
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self.bucket.acquireAsync()
+            deadline = loop.time() + timeout
+            parts, full = [], None
+            stream = self.llm.astream(messages).__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise LLMCallTimeout(f"{self.name} stream timed out after {timeout:g}s")
+                    full = chunk if full is None else full + chunk
+                    text = self.chunkText(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                if parts or attempt >= self.maxRetries or not self.isRetryable(e):
+                    observe_llm_call(self.name, messages, None, time.perf_counter() - started, attempt, "error")
+                    raise
+                delay = self.backoffDelay(attempt, e)
+                attempt += 1
+                print(f"⚠ {self.name} stream failed ({type(e).__name__}: {e}), retry {attempt}/{self.maxRetries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                if hasattr(stream, "aclose"):
+                    await stream.aclose()
+
+            response = AIMessage(content="".join(parts), usage_metadata=getattr(full, "usage_metadata", None))
+            observe_llm_call(self.name, messages, response, time.perf_counter() - started, attempt, "ok")
+            if self.cassette:
+                self.cassette.record(self.name, messages, response)
+            return
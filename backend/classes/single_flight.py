@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from utils.metrics import observe_single_flight
+
+
+# Deletes the lock only if this worker still holds it, so a lapsed lock taken over
+# by another worker is never released from under it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto a single computation.
+
+    Within a worker, callers of a key that is already in flight await the same
+    task. Across workers, when Redis is configured, the first worker takes a
+    lock key (SET NX with a TTL) and publishes its JSON result under a result
+    key; the others poll for the result until it appears or the lock lapses,
+    then retry. Redis errors degrade to per-worker coalescing. Results are only
+    shared while a spike lasts (resultTtl); longer-lived reuse is the semantic
+    cache's job. Fields of a dict result that only mean something on the worker
+    that computed it (localFields) are left out of the published result; the
+    worker keeps their values for resultTtl and restores them for its own readers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redisHost: Optional[str] = None,
+        redisPort: int = 6379,
+        lockTtl: float = 600,
+        resultTtl: float = 60,
+        pollInterval: float = 0.25,
+        socketTimeout: float = 5.0,
+        localFields: tuple = ()
+    ):
+        self.name = name
+        self.localFields = localFields
+        # key → (expiry, local field values) of results this worker published
+        self.localResults: dict = {}
+        self.lockTtl = lockTtl
+        self.resultTtl = resultTtl
+        self.pollInterval = pollInterval
+        self.inflight: dict = {}
+        self.poolOptions = dict(
+            host=redisHost,
+            port=redisPort,
+            socket_timeout=socketTimeout,
+            socket_connect_timeout=socketTimeout,
+            decode_responses=True,
+        ) if redisHost else None
+        self._ar: Optional[aioredis.Redis] = None
+
+    @property
+    def ar(self) -> Optional[aioredis.Redis]:
+        """Async client, created on first use inside the event loop; None when Redis is off."""
+        if self._ar is None and self.poolOptions:
+            self._ar = aioredis.Redis(connection_pool=aioredis.ConnectionPool(**self.poolOptions))
+        return self._ar
+
+    def keyFor(self, data: Any) -> str:
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+        return f"singleflight:{self.name}:{digest}"
+
+    async def do(self, data: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return compute()'s result, sharing it with every concurrent call whose
+        data (the normalized request) is equal. compute must return JSON-serializable data.
+        """
+        key = self.keyFor(data)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.run(key, compute))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            observe_single_flight(self.name, "joined")
+        # A caller that disconnects must not cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ar is None:
+            observe_single_flight(self.name, "leader")
+            return await compute()
+
+        token = uuid.uuid4().hex
+        resultKey, lockKey = f"{key}:result", f"{key}:lock"
+        try:
+            while True:
+                cached = await self.ar.get(resultKey)
+                if cached is not None:
+                    observe_single_flight(self.name, "remote")
+                    return self.restoreLocal(key, json.loads(cached))
+                if await self.ar.set(lockKey, token, nx=True, px=int(self.lockTtl * 1000)):
+                    break
+                cached = await self.waitForResult(resultKey, lockKey)
+                if cached is not None:
+                    observe_single_flight(self.name, "remote")
+                    return self.restoreLocal(key, json.loads(cached))
+                # The holder gave up or died without publishing; race for the lock again
+        except redis.exceptions.RedisError as e:
+            print(f"⚠ Single-flight {self.name}: redis unavailable, computing locally. error={e}")
+            observe_single_flight(self.name, "leader")
+            return await compute()
+
+        observe_single_flight(self.name, "leader")
+        try:
+            result = await compute()
+            self.rememberLocal(key, result)
+            try:
+                await self.ar.set(resultKey, json.dumps(self.publishable(result)), px=int(self.resultTtl * 1000))
+            except redis.exceptions.RedisError as e:
+                print(f"⚠ Single-flight {self.name}: could not publish result. error={e}")
+            return result
+        finally:
+            try:
+                await self.ar.eval(RELEASE_LOCK_SCRIPT, 1, lockKey, token)
+            except redis.exceptions.RedisError as e:
+                print(f"⚠ Single-flight {self.name}: could not release lock, it expires on its own. error={e}")
+
+    def publishable(self, result: Any) -> Any:
+        if not self.localFields or not isinstance(result, dict):
+            return result
+        return {key: value for key, value in result.items() if key not in self.localFields}
+
+    def rememberLocal(self, key: str, result: Any):
+        if not self.localFields or not isinstance(result, dict):
+            return
+        now = time.monotonic()
+        for expiredKey in [k for k, (expiresAt, _) in self.localResults.items() if expiresAt <= now]:
+            del self.localResults[expiredKey]
+        values = {field: result[field] for field in self.localFields if field in result}
+        if values:
+            self.localResults[key] = (now + self.resultTtl, values)
+
+    def restoreLocal(self, key: str, result: Any) -> Any:
+        """Put back the local fields of a published result this worker computed itself."""
+        entry = self.localResults.get(key)
+        if entry is None or entry[0] <= time.monotonic() or not isinstance(result, dict):
+            return result
+        return {**result, **entry[1]}
+
+    async def waitForResult(self, resultKey: str, lockKey: str) -> Optional[str]:
+        """Poll until the lock holder publishes its result; None once the lock is gone without one."""
+        deadline = time.monotonic() + self.lockTtl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.pollInterval)
+            cached = await self.ar.get(resultKey)
+            if cached is not None:
+                return cached
+            if not await self.ar.exists(lockKey):
+                # The result may have landed between the two reads
+                return await self.ar.get(resultKey)
+        return None
@@ -0,0 +1,409 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+from redis.commands.search.field import VectorField, TextField, TagField
+from redis.commands.search.query import Query
+
+
+class VectorBackend:
+    """
+    Storage engine behind SemanticCache.
+
+    Vectors are passed around as float32 bytes (what SemanticCache.embed returns).
+    search() returns hits as dicts with "similarity" (cosine, higher is closer),
+    "topic" and "output" (the stored JSON), best match first.
+    """
+
+    name = "base"
+
+    def ensureIndex(self) -> bool:
+        raise NotImplementedError
+
+    def search(self, namespace: str, vec: bytes, k: int) -> list:
+        raise NotImplementedError
+
+    def add(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        """Store a vector entry, and optionally its exact-match key, in one write."""
+        raise NotImplementedError
+
+    def getExact(self, key: str) -> Optional[tuple]:
+        """Return (outputJson, remainingTtl or None) for an exact-match key, or None."""
+        raise NotImplementedError
+
+    def setExact(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        raise NotImplementedError
+
+    # Async variants default to running the sync call in a thread
+    async def searchAsync(self, namespace: str, vec: bytes, k: int) -> list:
+        return await asyncio.to_thread(self.search, namespace, vec, k)
+
+    async def addAsync(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        await asyncio.to_thread(self.add, namespace, topic, vec, outputJson, ttl, exactKey)
+
+    async def getExactAsync(self, key: str) -> Optional[tuple]:
+        return await asyncio.to_thread(self.getExact, key)
+
+    async def setExactAsync(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        await asyncio.to_thread(self.setExact, key, outputJson, ttl)
+
+
+class RedisVectorBackend(VectorBackend):
+    """RediSearch HNSW index in Redis Stack, shared by every worker."""
+
+    name = "redis"
+
+    def __init__(
+        self,
+        redisHost: str = "localhost",
+        redisPort: int = 6379,
+        indexName: str = "semanticCacheIndex",
+        vectorField: str = "embedding",
+        topicField: str = "topic",
+        outputField: str = "output",
+        namespaceField: str = "namespace",
+        dim: int = 384,
+        distanceMetric: str = "COSINE",
+        maxConnections: int = 50,
+        socketTimeout: float = 5.0
+    ):
+        self.poolOptions = dict(
+            host=redisHost,
+            port=redisPort,
+            max_connections=maxConnections,
+            socket_timeout=socketTimeout,
+            socket_connect_timeout=socketTimeout,
+            health_check_interval=30,
+            decode_responses=False,
+        )
+        # Pooled clients only connect on first command, so this is cheap
+        self.r = redis.Redis(connection_pool=redis.ConnectionPool(**self.poolOptions))
+        self._ar: Optional[aioredis.Redis] = None
+        self.indexName = indexName
+        self.vectorField = vectorField
+        self.topicField = topicField
+        self.outputField = outputField
+        self.namespaceField = namespaceField
+        self.dim = dim
+        self.distanceMetric = distanceMetric
+
+    def ensureIndex(self) -> bool:
+        print("initIndex: attempting index creation")
+        try:
+            schema = [
+                VectorField(
+                    self.vectorField,
+                    "HNSW",
+                    {
+                        "TYPE": "FLOAT32",
+                        "DIM": self.dim,
+                        "DISTANCE_METRIC": self.distanceMetric,
+                    }
+                ),
+                TextField(self.topicField),
+                TagField(self.namespaceField)
+            ]
+            self.r.ft(self.indexName).create_index(schema)
+            print("initIndex: new index created")
+            return True
+        except redis.exceptions.ConnectionError as e:
+            print(f"initIndex: redis unavailable, will retry. error={e}")
+            return False
+        except Exception as e:
+            print(f"initIndex: index exists or failed, ignoring. error={e}")
+            return "already exists" in str(e).lower()
+
+    @property
+    def ar(self) -> aioredis.Redis:
+        """Async client with its own pool, created on first use inside the event loop."""
+        if self._ar is None:
+            self._ar = aioredis.Redis(connection_pool=aioredis.ConnectionPool(**self.poolOptions))
+        return self._ar
+
+    def escapeTag(self, value: str) -> str:
+        return re.sub(r"([^\w])", r"\\\1", value)
+
+    def decodeField(self, doc: Any, field: str) -> Any:
+        value = getattr(doc, field, None)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def buildQuery(self, namespace: str, k: int) -> Query:
+        knnQuery = f"(@{self.namespaceField}:{{{self.escapeTag(namespace)}}})=>[KNN {k} @{self.vectorField} $vec AS score]"
+        return Query(knnQuery).return_fields(self.topicField, self.outputField, "score").sort_by("score").dialect(2)
+
+    def toHits(self, res: Any) -> list:
+        return [
+            {
+                # RediSearch returns cosine distance
+                "similarity": 1 - float(doc.score),
+                "topic": self.decodeField(doc, self.topicField),
+                "output": self.decodeField(doc, self.outputField),
+            }
+            for doc in res.docs
+        ]
+
+    def search(self, namespace: str, vec: bytes, k: int) -> list:
+        res = self.r.ft(self.indexName).search(self.buildQuery(namespace, k), query_params={"vec": vec})
+        return self.toHits(res)
+
+    async def searchAsync(self, namespace: str, vec: bytes, k: int) -> list:
+        res = await self.ar.ft(self.indexName).search(self.buildQuery(namespace, k), query_params={"vec": vec})
+        return self.toHits(res)
+
+    def queueAdd(self, pipe: Any, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int], exactKey: Optional[str]) -> str:
+        key = f"{namespace}:{uuid.uuid4().hex}"
+        mapping = {
+            self.topicField: topic,
+            self.outputField: outputJson,
+            self.namespaceField: namespace,
+            self.vectorField: vec
+        }
+        pipe.hset(key, mapping=mapping)
+        if ttl:
+            pipe.expire(key, ttl)
+        if exactKey:
+            pipe.set(exactKey, outputJson, ex=ttl)
+        return key
+
+    def add(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        # HSET, EXPIRE and the exact-match SET go out as one MULTI/EXEC round trip
+        pipe = self.r.pipeline(transaction=True)
+        key = self.queueAdd(pipe, namespace, topic, vec, outputJson, ttl, exactKey)
+        pipe.execute()
+        print(f"saveToCache: saved with key={key}, ttl={ttl}")
+
+    async def addAsync(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        pipe = self.ar.pipeline(transaction=True)
+        key = self.queueAdd(pipe, namespace, topic, vec, outputJson, ttl, exactKey)
+        await pipe.execute()
+        print(f"saveToCache: saved with key={key}, ttl={ttl}")
+
+    def toExact(self, outBytes: Any, remainingTtl: Any) -> Optional[tuple]:
+        if outBytes is None:
+            return None
+        outputJson = outBytes.decode() if isinstance(outBytes, bytes) else outBytes
+        return outputJson, remainingTtl if remainingTtl and remainingTtl > 0 else None
+
+    def getExact(self, key: str) -> Optional[tuple]:
+        pipe = self.r.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        return self.toExact(*pipe.execute())
+
+    async def getExactAsync(self, key: str) -> Optional[tuple]:
+        pipe = self.ar.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        return self.toExact(*(await pipe.execute()))
+
+    def setExact(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        self.r.set(key, outputJson, ex=ttl)
+
+    async def setExactAsync(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        await self.ar.set(key, outputJson, ex=ttl)
+
+    def ping(self) -> bool:
+        try:
+            return bool(self.r.ping())
+        except Exception:
+            return False
+
+    def supportsSearch(self) -> bool:
+        """True if Redis is reachable and has the search module (Redis Stack)."""
+        try:
+            modules = self.r.module_list()
+        except Exception:
+            return False
+        names = {(m.get(b"name") or m.get("name") or b"") for m in modules}
+        names = {n.decode() if isinstance(n, bytes) else n for n in names}
+        return "search" in names or "ft" in names
+
+
+class LocalVectorBackend(VectorBackend):
+    """
+    In-process vector index for single-node deployments and tests.
+
+    Vectors live in one contiguous float32 matrix, L2-normalized on insert, so a
+    query is a single matrix-vector product followed by an argpartition top-k.
+    The index can be snapshotted to disk and restored on startup.
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = 384, initialCapacity: int = 1024, snapshotPath: Optional[str] = None):
+        self.dim = dim
+        self.lock = threading.RLock()
+        self.vectors = np.zeros((initialCapacity, dim), dtype=np.float32)
+        self.namespaceIds = np.zeros(initialCapacity, dtype=np.int32)
+        self.expiresAt = np.full(initialCapacity, np.inf, dtype=np.float64)
+        self.count = 0
+        self.topics: list = []
+        self.outputs: list = []
+        self.namespaces: dict = {}
+        # Exact-match keys: key -> (expiresAt or None, outputJson)
+        self.exact: dict = {}
+        self.snapshotPath = snapshotPath
+        if snapshotPath and os.path.exists(os.path.join(snapshotPath, "meta.json")):
+            self.restore(snapshotPath)
+
+    def ensureIndex(self) -> bool:
+        return True
+
+    def ping(self) -> bool:
+        return True
+
+    def namespaceId(self, namespace: str, create: bool = False) -> Optional[int]:
+        if namespace not in self.namespaces and create:
+            self.namespaces[namespace] = len(self.namespaces)
+        return self.namespaces.get(namespace)
+
+    def grow(self):
+        capacity = self.vectors.shape[0] * 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.count] = self.vectors[:self.count]
+        namespaceIds = np.zeros(capacity, dtype=np.int32)
+        namespaceIds[:self.count] = self.namespaceIds[:self.count]
+        expiresAt = np.full(capacity, np.inf, dtype=np.float64)
+        expiresAt[:self.count] = self.expiresAt[:self.count]
+        self.vectors, self.namespaceIds, self.expiresAt = vectors, namespaceIds, expiresAt
+
+    def compact(self):
+        """Drop expired rows, keeping the matrix contiguous."""
+        keep = np.flatnonzero(self.expiresAt[:self.count] > time.time())
+        if len(keep) == self.count:
+            return
+        n = len(keep)
+        self.vectors[:n] = self.vectors[keep]
+        self.namespaceIds[:n] = self.namespaceIds[keep]
+        self.expiresAt[:n] = self.expiresAt[keep]
+        self.expiresAt[n:self.count] = np.inf
+        self.topics = [self.topics[i] for i in keep]
+        self.outputs = [self.outputs[i] for i in keep]
+        print(f"LocalVectorBackend: compacted {self.count - n} expired rows")
+        self.count = n
+
+    def normalize(self, vec: bytes) -> np.ndarray:
+        v = np.frombuffer(vec, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def search(self, namespace: str, vec: bytes, k: int) -> list:
+        with self.lock:
+            nsId = self.namespaceId(namespace)
+            if nsId is None or self.count == 0:
+                return []
+            scores = self.vectors[:self.count] @ self.normalize(vec)
+            valid = (self.namespaceIds[:self.count] == nsId) & (self.expiresAt[:self.count] > time.time())
+            scores = np.where(valid, scores, -np.inf)
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"similarity": float(scores[i]), "topic": self.topics[i], "output": self.outputs[i]}
+                for i in top if np.isfinite(scores[i])
+            ]
+
+    def add(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        with self.lock:
+            if exactKey:
+                self.setExact(exactKey, outputJson, ttl)
+            if self.count == self.vectors.shape[0]:
+                self.compact()
+            if self.count == self.vectors.shape[0]:
+                self.grow()
+            i = self.count
+            self.vectors[i] = self.normalize(vec)
+            self.namespaceIds[i] = self.namespaceId(namespace, create=True)
+            self.expiresAt[i] = time.time() + ttl if ttl else np.inf
+            self.topics.append(topic)
+            self.outputs.append(outputJson)
+            self.count += 1
+
+    def getExact(self, key: str) -> Optional[tuple]:
+        with self.lock:
+            entry = self.exact.get(key)
+            if entry is None:
+                return None
+            expiresAt, outputJson = entry
+            if expiresAt is not None and expiresAt <= time.time():
+                del self.exact[key]
+                return None
+            return outputJson, int(expiresAt - time.time()) if expiresAt else None
+
+    def setExact(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        with self.lock:
+            self.exact[key] = (time.time() + ttl if ttl else None, outputJson)
+
+    # In-memory operations are fast enough to run directly on the event loop
+    async def searchAsync(self, namespace: str, vec: bytes, k: int) -> list:
+        return self.search(namespace, vec, k)
+
+    async def addAsync(self, namespace: str, topic: str, vec: bytes, outputJson: str, ttl: Optional[int] = None, exactKey: Optional[str] = None):
+        self.add(namespace, topic, vec, outputJson, ttl, exactKey)
+
+    async def getExactAsync(self, key: str) -> Optional[tuple]:
+        return self.getExact(key)
+
+    async def setExactAsync(self, key: str, outputJson: str, ttl: Optional[int] = None):
+        self.setExact(key, outputJson, ttl)
+
+    def snapshot(self, path: Optional[str] = None):
+        """Write the index to a directory (vectors.npy + meta.json), replacing any previous snapshot."""
+        path = path or self.snapshotPath
+        if not path:
+            raise ValueError("no snapshot path configured")
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            self.compact()
+            now = time.time()
+            meta = {
+                "dim": self.dim,
+                "namespaces": self.namespaces,
+                "namespaceIds": self.namespaceIds[:self.count].tolist(),
+                "expiresAt": [None if np.isinf(t) else float(t) for t in self.expiresAt[:self.count]],
+                "topics": self.topics,
+                "outputs": self.outputs,
+                "exact": {k: v for k, v in self.exact.items() if v[0] is None or v[0] > now},
+            }
+            vectorsTmp = os.path.join(path, "vectors.tmp.npy")
+            np.save(vectorsTmp, self.vectors[:self.count])
+        metaTmp = os.path.join(path, "meta.json.tmp")
+        with open(metaTmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(vectorsTmp, os.path.join(path, "vectors.npy"))
+        os.replace(metaTmp, os.path.join(path, "meta.json"))
+        print(f"LocalVectorBackend: snapshot of {len(meta['topics'])} rows written to {path}")
+
+    def restore(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            print(f"LocalVectorBackend: snapshot dim {meta['dim']} != {self.dim}, ignoring")
+            return
+        vectors = np.load(os.path.join(path, "vectors.npy"))
+        with self.lock:
+            n = len(meta["topics"])
+            self.vectors = np.zeros((max(n * 2, 1024), self.dim), dtype=np.float32)
+            self.vectors[:n] = vectors
+            self.namespaceIds = np.zeros(self.vectors.shape[0], dtype=np.int32)
+            self.namespaceIds[:n] = meta["namespaceIds"]
+            self.expiresAt = np.full(self.vectors.shape[0], np.inf, dtype=np.float64)
+            self.expiresAt[:n] = [np.inf if t is None else t for t in meta["expiresAt"]]
+            self.count = n
+            self.topics = meta["topics"]
+            self.outputs = meta["outputs"]
+            self.namespaces = meta["namespaces"]
+            self.exact = {k: tuple(v) for k, v in meta["exact"].items()}
+            self.compact()
+        print(f"LocalVectorBackend: restored {self.count} rows from {path}")
@@ -1,16 +1,52 @@
-from fastapi import FastAPI
+import os
+import json
+import asyncio
+import mimetypes
+from functools import partial
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from utils.component_gen_agent import generate_full_next_app
-from utils.outline_agent import generate_outline
-from utils.designer_agent import generate_design
-from utils.project_manager_agent import manage_project
+from fastapi.responses import StreamingResponse, JSONResponse, Response, FileResponse
+from utils.component_gen_agent import generate_full_next_app, SCAFFOLD_FILES, SCAFFOLD_HASH, SCAFFOLD_BUNDLE_JSON
+from utils.outline_agent import generate_outline_async
 from classes.cache import SemanticCache
-from utils.planner_agent import plan_website
+from classes.job_manager import JobManager, JobQueueFull
+from classes.generation_store import GenerationStore
+from classes.single_flight import SingleFlight
+from classes.artifact_store import ArtifactStore
+from utils.planner_agent import plan_website_async
 from pydantic import BaseModel
-from typing import List, Optional
-from utils.component_specs_agent import generate_component_specs
+from typing import List, Literal, Optional
+from utils.component_specs_agent import generate_component_specs_async
+from utils.pipeline import run_pipeline, generate_app, PIPELINE_PROFILE
+from utils.regeneration import run_regeneration, regenerate_app
+from utils.stage_cache import cached_stage, stage_cache_key
+from utils.metrics import metrics_payload
+from utils.archive import stream_archive, ARCHIVE_FORMATS
+from utils.encoding import encoded_response, event_stream_response
 app = FastAPI()
-cache = SemanticCache(redisHost="localhost", redisPort=6379)
+cache = SemanticCache(
+    redisHost="localhost",
+    redisPort=6379,
+    backend=os.environ.get("CACHE_BACKEND", "auto"),
+    snapshotPath=os.environ.get("CACHE_SNAPSHOT_PATH"),
+)
+artifacts = ArtifactStore.fromEnv()
+generations = GenerationStore(maxGenerations=int(os.environ.get("GENERATION_STORE_SIZE", "200")), artifacts=artifacts)
+# Identical concurrent requests share one generation; empty SINGLE_FLIGHT_REDIS_HOST keeps it per worker
+single_flight_options = dict(
+    redisHost=os.environ.get("SINGLE_FLIGHT_REDIS_HOST", "localhost") or None,
+    redisPort=int(os.environ.get("SINGLE_FLIGHT_REDIS_PORT", "6379")),
+    resultTtl=float(os.environ.get("SINGLE_FLIGHT_RESULT_TTL", "60")),
+)
+outline_flights = SingleFlight("outline", **single_flight_options)
+# generationId refers to this worker's GenerationStore, so followers on other workers don't get it
+generation_flights = SingleFlight("generate_code", localFields=("generationId",), **single_flight_options)
+jobs = JobManager(
+    partial(run_pipeline, cache=cache, store=generations),
+    workerCount=int(os.environ.get("JOB_WORKERS", "2")),
+    queueSize=int(os.environ.get("JOB_QUEUE_SIZE", "100")),
+    artifacts=artifacts,
+)
 
 
 class Outline(BaseModel):
@@ -23,6 +59,81 @@ class OutlineRequest(BaseModel):
 class GenerateCodeRequest(BaseModel):
     outline: Optional[List[Outline]] = None
     topic: Optional[str] = None
+    # "ref" leaves the static scaffold out of files and points to /scaffold/{hash} instead
+    scaffold: Literal["inline", "ref"] = "inline"
+    # Pipeline profile; defaults to the PIPELINE_PROFILE environment setting
+    profile: Optional[Literal["sequential", "parallel", "fast"]] = None
+    # "manifest" returns path → hash instead of file contents; files are served from /apps/{appId}/files/{path}
+    delivery: Literal["inline", "manifest"] = "inline"
+
+class GenerateArchiveRequest(BaseModel):
+    outline: Optional[List[Outline]] = None
+    topic: Optional[str] = None
+    profile: Optional[Literal["sequential", "parallel", "fast"]] = None
+    format: Literal["zip", "tar.gz"] = "zip"
+
+class RegenerateCodeRequest(BaseModel):
+    generationId: str
+    outline: List[Outline]
+    scaffold: Literal["inline", "ref"] = "inline"
+    delivery: Literal["inline", "manifest"] = "inline"
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different submissions coalesce."""
+    return " ".join(text.split()) if text else text
+
+
+def generate_code_flight_key(request):
+    """Normalized inputs that fully determine a /generate-code result."""
+    return {
+        "outline": [
+            {"sectionName": normalize_text(item.sectionName), "description": normalize_text(item.description)}
+            for item in request.outline or []
+        ],
+        "topic": normalize_text(request.topic or "").lower(),
+        "scaffold": request.scaffold,
+        "profile": request.profile or PIPELINE_PROFILE,
+    }
+
+
+# mimetypes maps .ts to MPEG transport streams and doesn't know .tsx
+SOURCE_MEDIA_TYPES = {".ts": "text/x-typescript", ".tsx": "text/x-typescript", ".mjs": "text/javascript"}
+
+
+def file_media_type(file_path):
+    extension = os.path.splitext(file_path)[1]
+    return SOURCE_MEDIA_TYPES.get(extension) or mimetypes.guess_type(file_path)[0] or "text/plain"
+
+
+async def deliver_app(result, delivery):
+    """
+    Persist a generated app in the artifact store and add its appId. With
+    "manifest" delivery the files are replaced by their path → hash manifest.
+    Results that are already stored (finished jobs) carry appId and manifest
+    instead of files; inline delivery reads their files back from the store.
+    """
+    if "files" not in result:
+        app_id, manifest = result["appId"], result["manifest"]
+        result = {key: value for key, value in result.items() if key != "manifest"}
+        if delivery == "inline":
+            return {**result, "files": await asyncio.to_thread(artifacts.readApp, manifest)}
+    else:
+        app_id, manifest = await asyncio.to_thread(artifacts.saveApp, result["files"])
+        if delivery == "inline":
+            return {**result, "appId": app_id}
+    result = {key: value for key, value in result.items() if key != "files"}
+    return {**result, "appId": app_id, "manifest": manifest, "filesUrl": f"/apps/{app_id}/files/"}
+
+
+def archive_response(chunks, archive_format, name):
+    """Stream an archive as a file download."""
+    media_type, extension = ARCHIVE_FORMATS[archive_format]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}{extension}"'},
+    )
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,72 +146,309 @@ app.add_middleware(
 
 
 
+@app.on_event("startup")
+async def start_job_workers():
+    jobs.start()
+
+
+async def warm_up_cache():
+    try:
+        await asyncio.to_thread(cache.warmUp)
+    except Exception as e:
+        print(f"⚠ Cache warm-up failed: {e}, cache will initialize on first use")
+
+
+@app.on_event("startup")
+async def start_cache_warm_up():
+    # Load the embedding model in the background so the worker can accept traffic right away
+    if os.environ.get("CACHE_WARMUP", "1") == "1":
+        app.state.cache_warm_up = asyncio.create_task(warm_up_cache())
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await jobs.stop()
+
+
+@app.on_event("shutdown")
+async def snapshot_cache():
+    # Only the local vector backend keeps state in process
+    if cache.snapshotPath:
+        try:
+            await asyncio.to_thread(cache.snapshot)
+        except Exception as e:
+            print(f"⚠ Cache snapshot failed: {e}")
+
+
 @app.get("/")
 def read_root():
     return {"message": "Hello FastAPI!"}
 
+@app.get("/healthz")
+def liveness():
+    """Liveness: the worker is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness: reports whether the semantic cache is warmed up and reachable."""
+    cache_status = await asyncio.to_thread(cache.status)
+    status_code = 200 if cache_status["ready"] else 503
+    return JSONResponse({"cache": cache_status}, status_code=status_code)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage and per-LLM-call latency, sizes, tokens, retries and cache hits."""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
 @app.get("/generate-outline")
-def get_generated_outline(topic: str):
-    # generated_outline = cache.getOrGenerate(topic, lambda: generate_outline(topic))
-    return {"outline":  generate_outline(topic)}
+async def get_generated_outline(topic: str, http_request: Request):
+    generated_outline = await outline_flights.do(
+        normalize_text(topic).lower(),
+        lambda: cached_stage(cache, "outline", stage_cache_key(topic), lambda: generate_outline_async(topic)),
+    )
+    return encoded_response({"outline": generated_outline}, http_request)
 
 
 @app.post("/generate-code")
-async def generate_code(request: GenerateCodeRequest):
+async def generate_code(request: GenerateCodeRequest, http_request: Request):
     """
     Generate code with integrated designer and project manager agents.
     Can accept either an outline or a topic string.
+    Concurrent identical requests, on any worker, share a single generation.
+    The response is gzip or brotli compressed, and MessagePack instead of
+    JSON, when the Accept-Encoding and Accept headers ask for it.
     """
-    # Get outline - either from request or generate from topic
-    if request.outline:
-        outline = request.outline
-        user_requirement = "User-provided outline"
-    elif request.topic:
-        user_requirement = request.topic
-        outline = generate_outline(request.topic)
-    else:
+    if not request.outline and not request.topic:
         return {"error": "Either 'outline' or 'topic' must be provided"}
     
-    # Step 1: Designer Agent (using Gemini)
-    print("🎨 Designer agent generating design recommendations...")
-    try:
-        design_recommendations = generate_design(user_requirement, outline)
-        print(f"✓ Design theme: {design_recommendations.theme.mode} mode, {design_recommendations.theme.primaryColor} primary")
-    except Exception as e:
-        print(f"⚠ Designer agent error: {e}, continuing without design recommendations")
-        design_recommendations = None
-    
-    # Step 2: Project Manager Agent (using Gemini)
-    print("📋 Project manager scoping project...")
+    preview_data = await generation_flights.do(
+        generate_code_flight_key(request),
+        lambda: generate_app(
+            request.outline, request.topic, cache=cache, inline_scaffold=request.scaffold == "inline",
+            store=generations, profile=request.profile,
+        ),
+    )
+    return encoded_response(await deliver_app(preview_data, request.delivery), http_request)
+
+
+@app.post("/generate-code/regenerate")
+async def regenerate_code(request: RegenerateCodeRequest, http_request: Request):
+    """
+    Incrementally regenerate a previous generation after the outline was edited.
+    Only pages and components affected by the outline changes are re-run.
+    """
+    previous = generations.get(request.generationId)
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Unknown generation")
+
+    result = await regenerate_app(
+        previous, request.outline, cache=cache, inline_scaffold=request.scaffold == "inline",
+        store=generations,
+    )
+    return encoded_response(await deliver_app(result, request.delivery), http_request)
+
+
+@app.post("/generate-code/regenerate/stream")
+async def regenerate_code_stream(request: RegenerateCodeRequest, http_request: Request):
+    """Streaming variant of /generate-code/regenerate, with the same events as /generate-code/stream."""
+    previous = generations.get(request.generationId)
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Unknown generation")
+
+    async def event_stream():
+        try:
+            async for event, data in run_regeneration(
+                previous, request.outline, cache=cache, inline_scaffold=request.scaffold == "inline",
+                store=generations,
+            ):
+                if event == "done":
+                    data = await deliver_app(data, request.delivery)
+                yield format_sse(event, data)
+        except Exception as e:
+            print(f"⚠ Streaming regeneration error: {e}")
+            yield format_sse("error", {"error": str(e)})
+
+    return event_stream_response(event_stream(), http_request)
+
+
+def format_sse(event, data):
+    """Format a single Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/generate-code/stream")
+async def generate_code_stream(request: GenerateCodeRequest, http_request: Request):
+    """
+    Streaming variant of /generate-code.
+    Emits a `stage` event as each agent completes (and a `stages` event with
+    the revised stage list if the fast profile falls back), a `component` event as
+    soon as each component's code has streamed in, a `files` event for the
+    scaffold and for every page once all its components are generated,
+    and a final `done` event with the complete file map (or its manifest).
+    Events are compressed one by one when the client accepts gzip or brotli.
+    """
+    if not request.outline and not request.topic:
+        return {"error": "Either 'outline' or 'topic' must be provided"}
+
+    async def event_stream():
+        try:
+            async for event, data in run_pipeline(
+                request.outline, request.topic, cache=cache, inline_scaffold=request.scaffold == "inline",
+                store=generations, profile=request.profile,
+            ):
+                if event == "done":
+                    data = await deliver_app(data, request.delivery)
+                yield format_sse(event, data)
+        except Exception as e:
+            print(f"⚠ Streaming generation error: {e}")
+            yield format_sse("error", {"error": str(e)})
+
+    return event_stream_response(event_stream(), http_request)
+
+@app.post("/generate-code/archive")
+async def generate_code_archive(request: GenerateArchiveRequest):
+    """
+    Generate an app and stream it as a zip or tar.gz download. Each page's
+    files are compressed into the archive as soon as the page is generated,
+    so the archive is never held in memory as a whole. The archive always
+    contains the scaffold, so it unpacks into a runnable project.
+    """
+    if not request.outline and not request.topic:
+        return {"error": "Either 'outline' or 'topic' must be provided"}
+
+    async def generated_files():
+        try:
+            async for event, data in run_pipeline(
+                request.outline, request.topic, cache=cache, inline_scaffold=True, profile=request.profile,
+            ):
+                if event == "files":
+                    for item in data["files"].items():
+                        yield item
+        except Exception as e:
+            # The response has already started, so the client sees a truncated archive
+            print(f"⚠ Archive generation error: {e}")
+            raise
+
+    return archive_response(
+        stream_archive(generated_files(), request.format, root="generated-next-app"), request.format, "generated-next-app"
+    )
+
+@app.post("/jobs")
+async def submit_job(request: GenerateCodeRequest):
+    """Enqueue a background generation and return its job id."""
+    if not request.outline and not request.topic:
+        return {"error": "Either 'outline' or 'topic' must be provided"}
     try:
-        project_plan = manage_project(user_requirement, outline, design_recommendations)
-        print(f"✓ Project complexity: {project_plan.scope.complexity}")
-    except Exception as e:
-        print(f"⚠ Project manager error: {e}, continuing without PM recommendations")
-        project_plan = None
-    
-    # Step 3: Planner Agent (integrates all inputs, uses Groq)
-    print("📐 Planner agent creating final plan...")
-    theme, pages = plan_website(outline, design_recommendations, project_plan, user_requirement)
-    print("Planned website structure: ", {"theme": theme, "pages": len(pages)})
-    
-    # Step 4: Component Specs
-    components_spec = generate_component_specs({"theme": theme, "pages": pages})
-    print("Generated component specs")
-    
-    # Step 5: Generate Full App
-    preview_data = await generate_full_next_app(components_spec, theme)
-    return preview_data
+        job = jobs.submit({
+            "outline": request.outline,
+            "topic": request.topic,
+            "inline_scaffold": request.scaffold == "inline",
+            "profile": request.profile,
+        })
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"jobId": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report a job's status, current stage and per-stage timings."""
+    job = jobs.getJob(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.toDict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str, http_request: Request, delivery: Literal["inline", "manifest"] = Query("inline")
+):
+    """Return the generated app once the job has completed, with its files or (delivery=manifest) their manifest."""
+    job = jobs.getJob(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail={"status": job.status, "error": job.error})
+    return encoded_response(await deliver_app(job.result, delivery), http_request)
+
+@app.get("/scaffold")
+def get_current_scaffold():
+    """Point to the current scaffold bundle."""
+    return {"hash": SCAFFOLD_HASH, "url": f"/scaffold/{SCAFFOLD_HASH}"}
+
+
+@app.get("/scaffold/{bundle_hash}")
+def get_scaffold(bundle_hash: str, request: Request):
+    """
+    Serve the precomputed scaffold bundle (config + shadcn/ui files).
+    Content-addressed, so clients and proxies can cache it forever.
+    """
+    if bundle_hash != SCAFFOLD_HASH:
+        raise HTTPException(status_code=404, detail="Unknown scaffold bundle")
+    etag = f'"{SCAFFOLD_HASH}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=SCAFFOLD_BUNDLE_JSON, media_type="application/json", headers=headers)
+
+@app.get("/apps/{app_id}")
+def get_app_manifest(app_id: str):
+    """Path → hash manifest of a stored app."""
+    manifest = artifacts.getManifest(app_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Unknown app")
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    return JSONResponse({"appId": app_id, "manifest": manifest}, headers=headers)
+
+
+@app.get("/apps/{app_id}/files/{file_path:path}")
+def get_app_file(app_id: str, file_path: str, request: Request):
+    """
+    Serve one file of a stored app straight from the artifact store.
+    App ids are manifest hashes, so a file URL's content never changes and can be cached forever.
+    """
+    blob = artifacts.fileBlob(app_id, file_path)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Unknown app file")
+    file_hash, blob_path = blob
+    etag = f'"{file_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(blob_path, media_type=file_media_type(file_path), headers=headers)
+
+@app.get("/apps/{app_id}/archive")
+def download_app(app_id: str, archive_format: Literal["zip", "tar.gz"] = Query("zip", alias="format")):
+    """
+    Stream a stored app as a zip or tar.gz, reading one file at a time from the artifact store.
+    Apps generated with scaffold "ref" are stored without the scaffold, so its
+    missing files are added to keep the download a runnable project.
+    """
+    manifest = artifacts.getManifest(app_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Unknown app")
+
+    async def stored_files():
+        for file_path, content in SCAFFOLD_FILES.items():
+            if file_path not in manifest:
+                yield file_path, content
+        for file_path, file_hash in manifest.items():
+            yield file_path, await asyncio.to_thread(artifacts.blobPath(file_hash).read_bytes)
+
+    name = f"app-{app_id[:12]}"
+    return archive_response(stream_archive(stored_files(), archive_format, root=name), archive_format, name)
 
 # Keep old endpoint for backward compatibility
 @app.post("/generate-code-legacy")
 async def generate_code_legacy(request: OutlineRequest):
     """Legacy endpoint that doesn't use designer/PM agents."""
-    theme, pages = plan_website(request.outline)
+    theme, pages = await plan_website_async(request.outline)
     print("Planned website structure: ", {"theme": theme})
-    components_spec= generate_component_specs({"theme": theme, "pages": pages})
+    components_spec= await generate_component_specs_async({"theme": theme, "pages": pages})
     print("Generated component specs")
-    preview_data = await generate_full_next_app(components_spec, theme)
+    preview_data = await generate_full_next_app(components_spec, theme, cache=cache)
     return preview_data
 
 
@@ -0,0 +1,32 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from classes.embedding_batcher import EmbeddingBatcher
+
+
+def test_cancelled_waiter_does_not_stop_the_batcher():
+    release = threading.Event()
+
+    def encode(texts):
+        release.wait(5)
+        return [len(text) for text in texts]
+
+    batcher = EmbeddingBatcher(encode, maxWaitMs=0)
+
+    async def cancel_queued_waiter():
+        # The first batch blocks the thread, so the second request is still queued when cancelled
+        busy = batcher.submit("busy")
+        waiter = asyncio.ensure_future(asyncio.wrap_future(batcher.submit("cancelled")))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.wrap_future(busy)
+
+    assert asyncio.run(cancel_queued_waiter()) == 4
+    assert batcher.submit("after").result(timeout=5) == 5
+    assert batcher.thread.is_alive()
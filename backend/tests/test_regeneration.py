@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# The provider clients are built at import time; these tests never reach them
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+import pytest
+
+import utils.call_ai as call_ai
+import utils.call_gemini as call_gemini
+from benchmarks.pipeline import SyntheticChatModel, build_outline
+from classes.artifact_store import ArtifactStore
+from classes.generation_store import GenerationStore
+from utils.pipeline import generate_app
+from utils.regeneration import regenerate_app
+
+
+class RecordingChatModel(SyntheticChatModel):
+    """Synthetic model that keeps every prompt it was sent."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def respond(self, messages):
+        self.prompts.append(messages[-1].content)
+        return super().respond(messages)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    model = RecordingChatModel()
+    for module in (call_ai, call_gemini):
+        monkeypatch.setattr(module.client, "llm", model)
+        monkeypatch.setattr(module.client, "cassette", None)
+    return model
+
+
+@pytest.fixture
+def store(tmp_path):
+    return GenerationStore(artifacts=ArtifactStore(str(tmp_path)))
+
+
+def test_edited_description_reaches_spec_and_component_prompts(llm, store):
+    outline = build_outline("small")
+    result = asyncio.run(generate_app(outline, store=store))
+
+    edited = [dict(section) for section in outline]
+    edited[1]["description"] = "Bento grid of features with hover-revealed screenshots"
+    llm.prompts.clear()
+    asyncio.run(regenerate_app(store.get(result["generationId"]), edited, store=store))
+
+    reaching = [prompt for prompt in llm.prompts if edited[1]["description"] in prompt]
+    assert any("Input structure:" in prompt for prompt in reaching), "edited description missing from the spec prompt"
+    assert any("Components to generate" in prompt for prompt in reaching), "edited description missing from the component prompt"
+
+
+def test_unchanged_outline_sends_no_prompts(llm, store):
+    outline = build_outline("small")
+    result = asyncio.run(generate_app(outline, store=store))
+
+    llm.prompts.clear()
+    regenerated = asyncio.run(regenerate_app(store.get(result["generationId"]), outline, store=store))
+
+    assert llm.prompts == []
+    assert regenerated["files"] == result["files"]
+    assert "files" not in store.get(result["generationId"])
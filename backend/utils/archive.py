@@ -0,0 +1,86 @@
+import tarfile
+import time
+import zipfile
+from io import BytesIO
+
+
+# format → (media type, file extension)
+ARCHIVE_FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar.gz": ("application/gzip", ".tar.gz"),
+}
+
+
+class ChunkBuffer:
+    """
+    Write-only, unseekable file object that collects what an archive writer
+    emits so it can be handed out chunk by chunk. zipfile and tarfile's stream
+    mode both support unseekable outputs, so nothing is ever rewritten.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ArchiveWriter:
+    """Builds a zip or tar.gz incrementally; each add() returns the bytes that are ready to send."""
+
+    def __init__(self, archive_format="zip", root=""):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {archive_format!r}, expected one of {tuple(ARCHIVE_FORMATS)}")
+        self.format = archive_format
+        self.root = f"{root.strip('/')}/" if root else ""
+        self.buffer = ChunkBuffer()
+        self.mtime = time.time()
+        if archive_format == "zip":
+            self.archive = zipfile.ZipFile(self.buffer, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(fileobj=self.buffer, mode="w|gz")
+
+    def add(self, path, content):
+        data = content.encode() if isinstance(content, str) else content
+        name = self.root + path.lstrip("/")
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.localtime(self.mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self.archive.addfile(info, BytesIO(data))
+        return self.buffer.drain()
+
+    def close(self):
+        """Finish the archive (zip central directory, tar end blocks) and return the last bytes."""
+        self.archive.close()
+        return self.buffer.drain()
+
+
+async def stream_archive(files, archive_format="zip", root=""):
+    """
+    Stream an archive of files, an async iterable of (path, content) pairs.
+
+    Each file is compressed and yielded as soon as it arrives, so memory stays
+    bounded by the largest file rather than the whole app.
+    """
+    writer = ArchiveWriter(archive_format, root)
+    async for path, content in files:
+        chunk = writer.add(path, content)
+        if chunk:
+            yield chunk
+    yield writer.close()
@@ -2,16 +2,32 @@ import os
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain.messages import SystemMessage, HumanMessage
+from classes.llm_client import LLMClient
+from classes.llm_cassette import LLMCassette
 
 load_dotenv()
 
+LLM_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", "60"))
+
+# Retries are handled by the shared client, so the SDK's own retries are off
 llm = ChatGroq(
     model="llama-3.3-70b-versatile",
     temperature=0,
-    api_key=os.environ.get("GROQ_API_KEY")
+    api_key=os.environ.get("GROQ_API_KEY"),
+    request_timeout=LLM_TIMEOUT,
+    max_retries=0
 )
 
-def call_ai(messages, systemPrompt="You are a helpful assistant."):
+client = LLMClient(
+    "groq",
+    llm,
+    requestsPerMinute=float(os.environ.get("GROQ_RPM", "30")),
+    maxRetries=int(os.environ.get("GROQ_MAX_RETRIES", "4")),
+    timeout=LLM_TIMEOUT,
+    cassette=LLMCassette.fromEnv()
+)
+
+def format_messages(messages, systemPrompt):
     formattedMessages = [SystemMessage(content=systemPrompt)]
 
     for msg in messages:
@@ -19,5 +35,12 @@ def call_ai(messages, systemPrompt="You are a helpful assistant."):
             HumanMessage(content=msg["content"])
         )
 
-    response = llm.invoke(formattedMessages)
+    return formattedMessages
+
+def call_ai(messages, systemPrompt="You are a helpful assistant."):
+    response = client.invoke(format_messages(messages, systemPrompt))
+    return response.content
+
+async def call_ai_async(messages, systemPrompt="You are a helpful assistant."):
+    response = await client.ainvoke(format_messages(messages, systemPrompt))
     return response.content
@@ -2,16 +2,33 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.messages import SystemMessage, HumanMessage
+from classes.llm_client import LLMClient
+from classes.llm_cassette import LLMCassette
 
 load_dotenv()
 
+# Component batches are long generations, so the default timeout is generous
+LLM_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "180"))
+
+# Retries are handled by the shared client, so the SDK's own retries are off
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     google_api_key=os.environ.get("GEMINI_API_KEY"),
-    temperature=0.7
+    temperature=0.7,
+    timeout=LLM_TIMEOUT,
+    max_retries=0
 )
 
-def call_gemini(messages, systemPrompt="You are a helpful assistant.", system_prompt=None):
+client = LLMClient(
+    "gemini",
+    llm,
+    requestsPerMinute=float(os.environ.get("GEMINI_RPM", "60")),
+    maxRetries=int(os.environ.get("GEMINI_MAX_RETRIES", "4")),
+    timeout=LLM_TIMEOUT,
+    cassette=LLMCassette.fromEnv()
+)
+
+def format_messages(messages, systemPrompt="You are a helpful assistant.", system_prompt=None):
     # Support both systemPrompt and system_prompt parameter names
     prompt = system_prompt if system_prompt is not None else systemPrompt
     chatMessages = [SystemMessage(content=prompt)]
@@ -19,5 +36,16 @@ def call_gemini(messages, systemPrompt="You are a helpful assistant.", system_pr
     for msg in messages:
         chatMessages.append(HumanMessage(content=msg["content"]))
 
-    response = llm.invoke(chatMessages)
+    return chatMessages
+
+def call_gemini(messages, systemPrompt="You are a helpful assistant.", system_prompt=None):
+    response = client.invoke(format_messages(messages, systemPrompt, system_prompt))
+    return response.content
+
+async def call_gemini_async(messages, systemPrompt="You are a helpful assistant.", system_prompt=None):
+    response = await client.ainvoke(format_messages(messages, systemPrompt, system_prompt))
     return response.content
+
+async def stream_gemini_async(messages, systemPrompt="You are a helpful assistant.", system_prompt=None):
+    async for text in client.astream(format_messages(messages, systemPrompt, system_prompt)):
+        yield text
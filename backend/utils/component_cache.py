@@ -0,0 +1,90 @@
+import os
+import re
+import asyncio
+import hashlib
+
+
+# Components are only reused under an identical theme, so the theme picks the
+# namespace and the spec text is what gets matched semantically.
+COMPONENT_CACHE_THRESHOLD = float(os.environ.get("COMPONENT_CACHE_THRESHOLD", "0.93"))
+COMPONENT_CACHE_TTL = int(os.environ.get("COMPONENT_CACHE_TTL", str(7 * 24 * 3600)))
+COMPONENT_CACHE_ENABLED = os.environ.get("COMPONENT_CACHE_ENABLED", "1") == "1"
+
+# Theme fields that build_batch_component_prompt puts into the prompt
+THEME_FIELDS = ("mode", "primaryColor", "radius", "spacing")
+
+
+def normalize_text(value):
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def component_cache_namespace(theme):
+    """Namespace for a theme: same theme fields, same namespace."""
+    theme = theme or {}
+    theme_key = "|".join(normalize_text(theme.get(field, "")) for field in THEME_FIELDS)
+    return f"component_{hashlib.sha256(theme_key.encode()).hexdigest()[:16]}"
+
+
+def component_cache_key(spec):
+    """Normalized ComponentSpec text: name, type, props, usage and, for regenerated sections, the outline description."""
+    props = sorted(normalize_text(prop) for prop in spec.get("props", []))
+    key = (
+        f"{normalize_text(spec.get('name'))} {normalize_text(spec.get('type'))} "
+        f"props {' '.join(props)} usage {normalize_text(spec.get('usage'))}"
+    )
+    if spec.get("description"):
+        key += f" description {normalize_text(spec['description'])}"
+    return key
+
+
+async def lookup_cached_components(cache, components, theme=None):
+    """
+    Look up every component of a page in the component cache.
+
+    Returns (hits, misses): hits maps component IDs to cached TSX,
+    misses maps the remaining component IDs to their specs.
+    """
+    if cache is None or not COMPONENT_CACHE_ENABLED:
+        return {}, dict(components)
+
+    namespace = component_cache_namespace(theme)
+
+    async def lookup(spec):
+        try:
+            return await cache.semanticLookupAsync(
+                component_cache_key(spec), threshold=COMPONENT_CACHE_THRESHOLD, namespace=namespace
+            )
+        except Exception as e:
+            print(f"⚠ Component cache lookup failed: {e}")
+            return None
+
+    results = await asyncio.gather(*(lookup(spec) for spec in components.values()))
+    hits, misses = {}, {}
+    for (comp_id, spec), code in zip(components.items(), results):
+        if isinstance(code, str) and code:
+            hits[comp_id] = code
+        else:
+            misses[comp_id] = spec
+    if hits:
+        print(f"Component cache: {len(hits)} hits, {len(misses)} misses")
+    return hits, misses
+
+
+async def save_generated_components(cache, components, codes, theme=None):
+    """Store freshly generated component code, keyed by spec, under the theme's namespace."""
+    if cache is None or not COMPONENT_CACHE_ENABLED:
+        return
+
+    namespace = component_cache_namespace(theme)
+
+    async def save(spec, code):
+        try:
+            await cache.saveToCacheAsync(
+                component_cache_key(spec), code, ttl=COMPONENT_CACHE_TTL, namespace=namespace
+            )
+        except Exception as e:
+            print(f"⚠ Component cache save failed: {e}")
+
+    await asyncio.gather(*(
+        save(components[comp_id], code) for comp_id, code in codes.items() if comp_id in components
+    ))
@@ -1,11 +1,31 @@
+import os
 import json
 import asyncio
+import hashlib
+from types import MappingProxyType
+from typing import Optional
 from pydantic import BaseModel, Field
-from utils.call_gemini import call_gemini 
+from utils.call_gemini import stream_gemini_async
+from utils.json_stream import ObjectStreamParser
+from utils.component_cache import lookup_cached_components, save_generated_components
+from utils.prompt_utils import compact_json, compact_spec, report_prompt
+
+
+# Max number of pages whose component batches are generated at the same time
+PAGE_GENERATION_CONCURRENCY = int(os.environ.get("PAGE_GENERATION_CONCURRENCY", "4"))
+
+# Output tokens one component batch may ask for; kept well under Gemini's output
+# limit, which also has to fit the model's thinking tokens
+COMPONENT_OUTPUT_TOKEN_BUDGET = int(os.environ.get("COMPONENT_OUTPUT_TOKEN_BUDGET", "6000"))
+
+# Rough output size of a generated component by spec type, before props and state
+COMPONENT_BASE_OUTPUT_TOKENS = {"layout": 600, "section": 900, "component": 450}
 
 
 class GeneratedApp(BaseModel):
     files: dict[str, str] = Field(..., description="Dictionary mapping file paths to their content")
+    scaffold: Optional[dict] = Field(None, description="Reference to the shared scaffold bundle when it is not inlined in files")
+    generationId: Optional[str] = Field(None, description="ID of the stored generation, usable for incremental regeneration")
 
 
 # Modern Next.js 14+ dependencies with shadcn/ui support
@@ -222,45 +242,162 @@ export function cn(...inputs: ClassValue[]) {
 """
 
 
-async def generate_full_next_app(component_specs, theme=None):
+async def generate_full_next_app(component_specs, theme=None, concurrent=True, max_concurrency=None, cache=None, inline_scaffold=True):
     """
     Generate a complete Next.js 14+ App Router application.
     
     Args:
         component_specs: Dict mapping page routes to component specs
         theme: Optional theme configuration from planner
+        concurrent: Generate all pages at the same time instead of one by one
+        max_concurrency: Max pages in flight (defaults to PAGE_GENERATION_CONCURRENCY)
+        cache: Optional SemanticCache used as a per-component code cache
+        inline_scaffold: Include the static scaffold files; when False the response
+            refers to the shared bundle by hash instead
     """
-    files = {}
+    groups = {}
+    
+    async for group, group_files in iter_full_next_app(
+        component_specs, theme, concurrent=concurrent, max_concurrency=max_concurrency, cache=cache,
+        inline_scaffold=inline_scaffold
+    ):
+        groups[group] = group_files
+    
+    print("✓ All components and pages generated")
+    return GeneratedApp(
+        files=merge_file_groups(groups, component_specs),
+        scaffold=None if inline_scaffold else scaffold_reference()
+    ).model_dump(exclude_none=True)
+
+
+async def iter_full_next_app(component_specs, theme=None, concurrent=True, max_concurrency=None, cache=None, inline_scaffold=True, stream_components=False):
+    """
+    Generate the app incrementally, yielding files as soon as they are ready.
+    
+    Yields (group, files) tuples: ("scaffold", {...}) first with the config
+    files and root layout, then (page_route, {...}) for every page once its
+    component batch returns. In concurrent mode pages are yielded in
+    completion order; use merge_file_groups to get a stable file order.
+    With inline_scaffold=False the scaffold group only holds the root layout.
+    With stream_components=True, ("component", {path: code}) is also yielded
+    for each component the moment its code is complete, before its page.
+    """
+    scaffold_files = {}
     
     # Generate config files first
-    generate_config_files(files)
+    if inline_scaffold:
+        generate_config_files(scaffold_files)
     
     # Generate root layout
-    generate_root_layout(files, theme)
+    generate_root_layout(scaffold_files, theme)
+    yield "scaffold", scaffold_files
     
     # Generate components and pages in batches (one API call per page)
-    print(f"Generating components for {len(component_specs)} pages...")
+    total_pages = len(component_specs)
+    print(f"Generating components for {total_pages} pages...")
     
-    for page_idx, (page_route, components) in enumerate(component_specs.items(), 1):
-        print(f"[{page_idx}/{len(component_specs)}] Generating page: {page_route}")
-        
-        # Generate all components for this page in one batch
-        page_components = await generate_page_components_batch(
-            page_route, components, theme
-        )
-        files.update(page_components)
-        
-        # Assemble the page.tsx file
-        page_code = assemble_page_with_types(page_route, components)
-        page_folder = get_page_folder(page_route)
-        files[f"{page_folder}/page.tsx"] = page_code
+    # Sequential mode is a single slot; the semaphore hands it out in page order
+    semaphore = asyncio.Semaphore((max_concurrency or PAGE_GENERATION_CONCURRENCY) if concurrent else 1)
+    events = asyncio.Queue()
     
-    print("✓ All components and pages generated")
-    return GeneratedApp(files=files).model_dump()
+    async def run_page(page_idx, page_route, components):
+        on_component = None
+        if stream_components:
+            on_component = lambda file_path, code: events.put_nowait(("component", {file_path: code}))
+        async with semaphore:
+            print(f"[{page_idx}/{total_pages}] Generating page: {page_route}")
+            try:
+                page_files = await generate_page_files(page_route, components, theme, cache, on_component)
+            except Exception as e:
+                events.put_nowait((None, e))
+                return
+            events.put_nowait((page_route, page_files))
+    
+    tasks = [
+        asyncio.create_task(run_page(page_idx, page_route, components))
+        for page_idx, (page_route, components) in enumerate(component_specs.items(), 1)
+    ]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            group, payload = await events.get()
+            if group is None:
+                raise payload
+            if group != "component":
+                remaining -= 1
+            yield group, payload
+    finally:
+        # Don't leave pages running if the consumer stops early or a page fails
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_page_files(page_route, components, theme=None, cache=None, on_component=None):
+    """Generate a page's components and assemble its page.tsx."""
+    # Generate all components for this page in one batch
+    page_files = await generate_page_components_batch(
+        page_route, components, theme, cache, on_component
+    )
+    
+    # Assemble the page.tsx file
+    page_code = assemble_page_with_types(page_route, components)
+    page_folder = get_page_folder(page_route)
+    page_files[f"{page_folder}/page.tsx"] = page_code
+    return page_files
+
+
+async def regenerate_page_files(page_route, components, stale_ids, previous_manifest, artifacts, theme=None, cache=None):
+    """
+    Rebuild a page, reusing component files from a previous generation.
+    
+    Reused files are read from the ArtifactStore through the previous
+    generation's path → hash manifest. Only components listed in stale_ids,
+    or whose file is missing from the manifest, are generated again;
+    page.tsx is always re-assembled.
+    """
+    page_folder = get_page_folder(page_route)
+    
+    reused = {}
+    for comp_id in components:
+        file_path = f"{page_folder}/components/{to_pascal_case(comp_id)}.tsx"
+        if comp_id not in stale_ids and file_path in previous_manifest:
+            reused[file_path] = await asyncio.to_thread(artifacts.readFile, previous_manifest[file_path])
+    
+    stale = {
+        comp_id: spec for comp_id, spec in components.items()
+        if f"{page_folder}/components/{to_pascal_case(comp_id)}.tsx" not in reused
+    }
+    generated = await generate_page_components_batch(page_route, stale, theme, cache) if stale else {}
+    
+    # Keep page order for components, then anything extra the batch returned
+    page_files = {}
+    for comp_id in components:
+        file_path = f"{page_folder}/components/{to_pascal_case(comp_id)}.tsx"
+        if file_path in reused or file_path in generated:
+            page_files[file_path] = reused.get(file_path) or generated[file_path]
+    for file_path, code in generated.items():
+        page_files.setdefault(file_path, code)
+    
+    page_files[f"{page_folder}/page.tsx"] = assemble_page_with_types(page_route, components)
+    return page_files
+
+
+def merge_file_groups(groups, component_specs):
+    """Merge yielded file groups in scaffold-then-page order, regardless of completion order."""
+    files = {}
+    for group in ["scaffold", *component_specs.keys()]:
+        files.update(groups.get(group, {}))
+    return files
 
 
 def generate_config_files(files):
-    """Generate all necessary configuration files."""
+    """Add all necessary configuration files (the precomputed scaffold bundle)."""
+    files.update(SCAFFOLD_FILES)
+
+
+def build_scaffold_files():
+    """Build the static config and shadcn/ui files shared by every generated app."""
+    files = {}
     files["package.json"] = json.dumps(NEXT_PACKAGE_JSON, indent=2)
     files["next.config.js"] = NEXT_CONFIG_JS
     files["tsconfig.json"] = json.dumps(TS_CONFIG_JSON, indent=2)
@@ -271,6 +408,23 @@ def generate_config_files(files):
     
     # Generate basic shadcn/ui components
     generate_shadcn_components(files)
+    return files
+
+
+def hash_files(files):
+    """Content hash over a file map, independent of insertion order."""
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.encode())
+        digest.update(b"\0")
+        digest.update(files[path].encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def scaffold_reference():
+    """What generation responses carry instead of the inlined scaffold files."""
+    return {"hash": SCAFFOLD_HASH, "url": f"/scaffold/{SCAFFOLD_HASH}", "files": list(SCAFFOLD_FILES)}
 
 
 def generate_root_layout(files, theme=None):
@@ -305,53 +459,152 @@ export default function RootLayout({{
     files["app/layout.tsx"] = layout_code
 
 
-async def generate_page_components_batch(page_route, components, theme=None):
+async def generate_page_components_batch(page_route, components, theme=None, cache=None, on_component=None):
     """
-    Generate all components for a single page in one API call.
+    Generate all components for a single page, in one API call when their
+    estimated output fits COMPONENT_OUTPUT_TOKEN_BUDGET and in concurrent
+    sub-batches otherwise. Components found in the component cache are
+    served directly and only the misses are sent to the LLM, whose response
+    is streamed.
+    
+    on_component(file_path, code), if given, is called for every component
+    as soon as its code is available.
     
     Returns a dict mapping file paths to component code.
     """
     page_folder = get_page_folder(page_route)
     
-    # Build the prompt for batch generation
-    components_spec_list = []
-    for comp_id, spec in components.items():
-        components_spec_list.append({
-            "id": comp_id,
-            "spec": spec
-        })
+    def component_path(comp_id):
+        return f"{page_folder}/components/{to_pascal_case(comp_id)}.tsx"
+    
+    cached_code, missing = await lookup_cached_components(cache, components, theme)
+    components_code = {comp_id: clean_code(code) for comp_id, code in cached_code.items()}
+    if on_component:
+        for comp_id, code in components_code.items():
+            on_component(component_path(comp_id), code)
     
+    async def generate_batch(batch):
+        generated_code, parsed_json = {}, True
+        async for comp_id, code, clean in stream_components_code(page_route, batch, theme):
+            generated_code[comp_id] = clean_code(code)
+            parsed_json = parsed_json and clean
+            if on_component:
+                on_component(component_path(comp_id), generated_code[comp_id])
+        # Fallback extraction may contain placeholder components, so only cache clean JSON responses
+        if parsed_json:
+            await save_generated_components(cache, batch, generated_code, theme)
+        return generated_code
+    
+    if missing:
+        # Pages too large for one response are split into sub-batches that run concurrently
+        batches = plan_component_batches(missing)
+        if len(batches) > 1:
+            print(f"Splitting {page_route} into {len(batches)} component batches to fit the output budget")
+        # gather keeps batch order, so the merge doesn't depend on which batch finishes first
+        for generated_code in await asyncio.gather(*(generate_batch(batch) for batch in batches)):
+            components_code.update(generated_code)
+    
+    # Map to file paths, in page order
+    ordered_ids = [comp_id for comp_id in components if comp_id in components_code]
+    ordered_ids += [comp_id for comp_id in components_code if comp_id not in components]
+    return {component_path(comp_id): components_code[comp_id] for comp_id in ordered_ids}
+
+
+def estimate_component_output_tokens(spec):
+    """Estimate the output tokens of one component's code, JSON-escaped, from its spec."""
+    spec = spec if isinstance(spec, dict) else {}
+    tokens = COMPONENT_BASE_OUTPUT_TOKENS.get(spec.get("type"), COMPONENT_BASE_OUTPUT_TOKENS["section"])
+    tokens += 60 * len(spec.get("props") or [])
+    tokens += 80 * len(spec.get("state") or {})
+    tokens += 30 * len(spec.get("libraries") or [])
+    # Escaped quotes and newlines inflate the code by roughly 15% inside a JSON string
+    return int(tokens * 1.15)
+
+
+def plan_component_batches(components, budget=None):
+    """
+    Split a page's components into sub-batches whose estimated output fits the budget.
+    
+    Batches keep page order and are balanced so concurrent batches finish at
+    about the same time. A component estimated over the budget on its own
+    gets a batch of its own, and the rest are batched around it. Returns a
+    list of {comp_id: spec} dicts.
+    """
+    budget = budget or COMPONENT_OUTPUT_TOKEN_BUDGET
+    estimates = {comp_id: estimate_component_output_tokens(spec) for comp_id, spec in components.items()}
+    total = sum(estimates.values())
+    if total <= budget:
+        return [dict(components)] if components else []
+    
+    # Oversized components can never fit, so they must not push the others into tiny batches
+    oversized = [{comp_id: spec} for comp_id, spec in components.items() if estimates[comp_id] > budget]
+    rest = {comp_id: spec for comp_id, spec in components.items() if estimates[comp_id] <= budget}
+    total = sum(estimates[comp_id] for comp_id in rest)
+    if total <= budget:
+        return oversized + ([rest] if rest else [])
+    
+    # Place each component by the midpoint of its share of the page's output, using
+    # the fewest batches that all fit the budget
+    count = -(-total // budget)
+    while True:
+        batches, sizes = [{} for _ in range(count)], [0] * count
+        running = 0
+        for comp_id, spec in rest.items():
+            index = min(int((running + estimates[comp_id] / 2) * count / total), count - 1)
+            batches[index][comp_id] = spec
+            sizes[index] += estimates[comp_id]
+            running += estimates[comp_id]
+        if all(size <= budget for size in sizes) or count >= len(rest):
+            return oversized + [batch for batch in batches if batch]
+        count += 1
+
+
+async def stream_components_code(page_route, components, theme=None):
+    """
+    Stream the LLM's code for the given components.
+    
+    Yields (comp_id, code, parsed_json) as each component's JSON string value
+    closes in the streamed response. If the response turns out not to be a flat
+    JSON object of strings, the rest is recovered from the full text once the
+    stream ends, with parsed_json False for fallback-extracted components.
+    """
+    components_spec_list = [{"id": comp_id, "spec": spec} for comp_id, spec in components.items()]
     prompt = build_batch_component_prompt(components_spec_list, theme, page_route)
     
-    # Call AI to generate all components at once
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(
-        None, 
-        lambda: call_gemini(messages=[{"content": prompt}])
-    )
+    parser = ObjectStreamParser()
+    chunks = []
+    emitted = set()
+    async for chunk in stream_gemini_async(messages=[{"content": prompt}]):
+        chunks.append(chunk)
+        if parser.failed:
+            continue
+        for comp_id, code in parser.feed(chunk):
+            emitted.add(comp_id)
+            yield comp_id, code, True
+    
+    if parser.done:
+        return
     
-    # Parse the response (expecting JSON with component code)
+    print(f"⚠ Streamed response for {page_route} is not a flat JSON object, parsing full response")
+    components_code, parsed_json = parse_components_response("".join(chunks), components)
+    for comp_id, code in components_code.items():
+        if comp_id not in emitted:
+            yield comp_id, code, parsed_json
+
+
+def parse_components_response(response, components):
+    """Parse a complete component batch response: JSON first, then code-block extraction."""
     try:
         # Try to parse as JSON first
         parsed = json.loads(response)
         if isinstance(parsed, dict):
             # If it's a dict mapping component IDs to code
-            components_code = parsed
-        else:
-            # Fallback: try to extract code blocks
-            components_code = extract_components_from_response(response, components)
+            return parsed, True
+        # Fallback: try to extract code blocks
+        return extract_components_from_response(response, components), False
     except json.JSONDecodeError:
         # If not JSON, try to extract individual components
-        components_code = extract_components_from_response(response, components)
-    
-    # Map to file paths
-    files = {}
-    for comp_id, code in components_code.items():
-        comp_name = to_pascal_case(comp_id)
-        file_path = f"{page_folder}/components/{comp_name}.tsx"
-        files[file_path] = clean_code(code)
-    
-    return files
+        return extract_components_from_response(response, components), False
 
 
 def build_batch_component_prompt(components_spec_list, theme, page_route):
@@ -366,7 +619,9 @@ Theme Configuration:
 - Spacing: {theme.get('spacing', 'comfortable')}
 """
     
-    components_json = json.dumps(components_spec_list, indent=2)
+    components_json = compact_json([
+        {"id": comp["id"], "spec": compact_spec(comp["spec"])} for comp in components_spec_list
+    ])
     
     # Build component list for the prompt
     component_ids = [comp["id"] for comp in components_spec_list]
@@ -405,7 +660,7 @@ CRITICAL:
 - Escape quotes and newlines properly in JSON strings
 - Use double quotes for JSON keys and string values
 """
-    return prompt
+    return report_prompt("components", prompt)
 
 
 def extract_components_from_response(response, components):
@@ -741,3 +996,9 @@ def clean_code(code):
         code = code[:-3]
     
     return code.strip()
+
+
+# The scaffold never changes at runtime, so build, hash and serialize it once at import
+SCAFFOLD_FILES = MappingProxyType(build_scaffold_files())
+SCAFFOLD_HASH = hash_files(SCAFFOLD_FILES)
+SCAFFOLD_BUNDLE_JSON = json.dumps({"hash": SCAFFOLD_HASH, "files": dict(SCAFFOLD_FILES)}).encode()
@@ -1,8 +1,8 @@
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from pydantic import BaseModel, Field, RootModel
 from typing import Literal
-from utils.call_ai import call_ai
-import json
+from utils.call_ai import call_ai, call_ai_async
+from utils.prompt_utils import compact_json, compact_planned_structure, report_prompt, format_instructions
 
 
 class ComponentSpec(BaseModel):
@@ -25,28 +25,11 @@ class ComponentSpecsOutput(RootModel[dict[str, dict[str, ComponentSpec]]]):
 
 
 parser = PydanticOutputParser(pydantic_object=ComponentSpecsOutput)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
 
 
-def generate_component_specs(planned_structure):
-    """
-    Input: planned_structure = {
-        "theme": {...},
-        "pages": [...]
-    }
-    Output: {
-        "pageRoute": {
-            "componentId": {
-                "name": str,
-                "type": "layout | section | component",
-                "props": [...],
-                "state": {...},
-                "libraries": [...],
-                "usage": "guideline or description"
-            }
-        }
-    }
-    """
-
+def build_component_specs_prompt(planned_structure):
+    """Build the component spec prompt for a planned {"theme", "pages"} structure."""
     print(f"Sending to AI - Input structure keys: {planned_structure.keys()}")
     print(f"Number of pages: {len(planned_structure.get('pages', []))}")
 
@@ -70,16 +53,18 @@ Rules:
 - Be deterministic and concise
 
 Input structure:
-{json.dumps(planned_structure)}
+{compact_json(compact_planned_structure(planned_structure))}
 
 Return ONLY valid JSON.
 Do not include extra text.
 
-{parser.get_format_instructions()}
+{FORMAT_INSTRUCTIONS}
 """
+    return report_prompt("component_specs", prompt)
 
-    response = call_ai([{"content": prompt}])
-    
+
+def parse_component_specs(response):
+    """Validate and parse the component spec response."""
     if not response or response.strip() == "":
         print("ERROR: AI returned empty response")
         raise ValueError("Component Spec Agent returned empty response")
@@ -91,6 +76,36 @@ Do not include extra text.
     return parsed.model_dump()
 
 
+def generate_component_specs(planned_structure):
+    """
+    Input: planned_structure = {
+        "theme": {...},
+        "pages": [...]
+    }
+    Output: {
+        "pageRoute": {
+            "componentId": {
+                "name": str,
+                "type": "layout | section | component",
+                "props": [...],
+                "state": {...},
+                "libraries": [...],
+                "usage": "guideline or description"
+            }
+        }
+    }
+    """
+
+    response = call_ai([{"content": build_component_specs_prompt(planned_structure)}])
+    return parse_component_specs(response)
+
+
+async def generate_component_specs_async(planned_structure):
+    """Async version of generate_component_specs that doesn't block the event loop."""
+    response = await call_ai_async([{"content": build_component_specs_prompt(planned_structure)}])
+    return parse_component_specs(response)
+
+
 if __name__ == "__main__":
     sample_structure = {
         "theme": {
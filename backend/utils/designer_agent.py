@@ -1,8 +1,8 @@
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import Literal
-from utils.call_gemini import call_gemini
-import json
+from utils.call_gemini import call_gemini, call_gemini_async
+from utils.prompt_utils import compact_json, outline_data, report_prompt, format_instructions
 
 
 class DesignTheme(BaseModel):
@@ -25,27 +25,18 @@ class DesignRecommendations(BaseModel):
 
 
 parser = PydanticOutputParser(pydantic_object=DesignRecommendations)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
 
+DESIGNER_SYSTEM_PROMPT = "You are an expert UI/UX designer. Always respond with valid JSON matching the requested schema."
 
-def generate_design(user_requirement, outline=None):
-    """
-    Generate modern, futuristic design recommendations using Gemini.
-    
-    Args:
-        user_requirement: User's original prompt/requirement
-        outline: Optional outline data for context
-    
-    Returns:
-        DesignRecommendations object
-    """
+
+def build_design_prompt(user_requirement, outline=None):
+    """Build the designer prompt from the user requirement and optional outline."""
     outline_context = ""
     if outline:
-        outline_data = outline
-        if hasattr(outline, '__iter__') and outline and hasattr(outline[0], 'model_dump'):
-            outline_data = [item.model_dump() for item in outline]
         outline_context = f"""
 Website Outline Context:
-{json.dumps(outline_data, indent=2)}
+{compact_json(outline_data(outline))}
 """
     
     prompt = f"""You are an expert UI/UX designer specializing in modern, futuristic, and cutting-edge web design.
@@ -76,20 +67,43 @@ Generate a complete design system including:
 - Component-specific guidelines
 - Modern UI patterns to incorporate
 
-{parser.get_format_instructions()}
+{FORMAT_INSTRUCTIONS}
 
 Return ONLY valid JSON matching the schema above.
 """
+    return report_prompt("designer", prompt)
+
+
+def generate_design(user_requirement, outline=None):
+    """
+    Generate modern, futuristic design recommendations using Gemini.
+    
+    Args:
+        user_requirement: User's original prompt/requirement
+        outline: Optional outline data for context
     
+    Returns:
+        DesignRecommendations object
+    """
     response = call_gemini(
-        [{"content": prompt}],
-        system_prompt="You are an expert UI/UX designer. Always respond with valid JSON matching the requested schema."
+        [{"content": build_design_prompt(user_requirement, outline)}],
+        system_prompt=DESIGNER_SYSTEM_PROMPT
     )
     
     parsed = parser.parse(response)
     return parsed
 
 
+async def generate_design_async(user_requirement, outline=None):
+    """Async version of generate_design that doesn't block the event loop."""
+    response = await call_gemini_async(
+        [{"content": build_design_prompt(user_requirement, outline)}],
+        system_prompt=DESIGNER_SYSTEM_PROMPT
+    )
+    
+    return parser.parse(response)
+
+
 if __name__ == "__main__":
     requirement = "A modern SaaS dashboard for project management"
     design = generate_design(requirement)
@@ -0,0 +1,139 @@
+import gzip
+import json
+import os
+import zlib
+from fastapi.responses import Response, StreamingResponse
+
+# brotli and msgpack are in requirements.txt; an install without them falls back to gzip and JSON
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Small bodies gain nothing from compression but still pay for it
+COMPRESSION_MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+# Brotli's top qualities are far too slow for per-request compression; 5 beats gzip -6 at similar speed
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+
+VARY = "Accept, Accept-Encoding"
+
+
+def parse_accept(header):
+    """Parse an Accept or Accept-Encoding header into {token: q}, lowercased."""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, *params = [item.strip() for item in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token.lower()] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick "br", "gzip" or None for an Accept-Encoding header; brotli wins ties when installed."""
+    accepted = parse_accept(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def negotiate_format(accept):
+    """"msgpack" when the client asks for MessagePack and it is installed, else "json"."""
+    accepted = parse_accept(accept)
+    if msgpack and any(accepted.get(media_type, 0.0) > 0 for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def serialize(data, body_format="json"):
+    """Encode a response body; returns (bytes, media type)."""
+    if body_format == "msgpack":
+        return msgpack.packb(data, use_bin_type=True), MSGPACK_MEDIA_TYPES[0]
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode(), "application/json"
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def encoded_response(data, request, status_code=200):
+    """
+    JSON or MessagePack response, compressed with gzip or brotli, as negotiated
+    from the request's Accept and Accept-Encoding headers.
+    """
+    body, media_type = serialize(data, negotiate_format(request.headers.get("accept")))
+    headers = {"Vary": VARY}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= COMPRESSION_MIN_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+class StreamCompressor:
+    """
+    Compresses a stream one message at a time, flushing after each, so every
+    event reaches the client as soon as it is sent while the compression
+    context (and with it the repeated TSX boilerplate) carries across events.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16 + MAX_WBITS writes a gzip header and trailer
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+async def compress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+    yield compressor.finish()
+
+
+def event_stream_response(events, request):
+    """Server-Sent Events response, compressed per event when the client accepts it."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        events = compress_stream(events, encoding)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
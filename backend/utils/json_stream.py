@@ -0,0 +1,104 @@
+import json
+import re
+
+
+# Body of a JSON string up to (not including) its closing quote, escapes included
+STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+
+# LLMs often put raw newlines and tabs inside strings; accept them like the fallback extractor does
+STRING_DECODER = json.JSONDecoder(strict=False)
+
+
+class ObjectStreamParser:
+    """
+    Incremental parser for a streamed JSON object whose values are strings,
+    e.g. {"hero": "<tsx>", "footer": "<tsx>"}.
+
+    feed() takes the next chunk of text and returns the (key, value) pairs whose
+    value string closed within it. Every character is scanned once, whatever the
+    chunk boundaries. Text before the opening brace (such as a ```json fence) is
+    skipped. Anything that is not a flat object of strings sets `failed`, and the
+    caller should then parse the full response instead.
+    """
+
+    def __init__(self):
+        self.state = "start"
+        self.token = []
+        self.escape = False
+        self.key = None
+        self.failed = False
+        self.done = False
+
+    def feed(self, chunk):
+        pairs = []
+        i, n = 0, len(chunk)
+        while i < n and not self.failed and not self.done:
+            if self.state in ("key", "value"):
+                end = self.scanString(chunk, i)
+                if end is None:
+                    self.token.append(chunk[i:])
+                    break
+                self.token.append(chunk[i:end])
+                i = end + 1
+                try:
+                    text = STRING_DECODER.decode('"' + "".join(self.token) + '"')
+                except json.JSONDecodeError:
+                    self.failed = True
+                    break
+                self.token = []
+                if self.state == "key":
+                    self.key = text
+                    self.state = "colon"
+                else:
+                    pairs.append((self.key, text))
+                    self.state = "comma"
+                continue
+
+            char = chunk[i]
+            i += 1
+            if char.isspace():
+                continue
+            if self.state == "start":
+                if char == "{":
+                    self.state = "key_or_end"
+            elif self.state == "key_or_end":
+                if char == '"':
+                    self.state = "key"
+                elif char == "}":
+                    self.done = True
+                else:
+                    self.failed = True
+            elif self.state == "colon":
+                if char == ":":
+                    self.state = "value_start"
+                else:
+                    self.failed = True
+            elif self.state == "value_start":
+                if char == '"':
+                    self.state = "value"
+                else:
+                    self.failed = True
+            elif self.state == "comma":
+                if char == ",":
+                    self.state = "key_or_end"
+                elif char == "}":
+                    self.done = True
+                else:
+                    self.failed = True
+        return pairs
+
+    def scanString(self, chunk, start):
+        """Index of the closing quote of the current string in chunk, or None if it continues."""
+        if self.escape:
+            if start >= len(chunk):
+                return None
+            self.escape = False
+            start += 1
+        end = STRING_BODY.match(chunk, start).end()
+        if end >= len(chunk):
+            return None
+        if chunk[end] == "\\":
+            # A backslash can only stop the match as the chunk's last character
+            self.escape = True
+            return None
+        return end
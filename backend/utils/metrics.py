@@ -0,0 +1,94 @@
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+
+# Stages range from sub-second cache hits to multi-minute component batches
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+STAGE_DURATION = Histogram(
+    "autoui_stage_duration_seconds", "Wall time of each pipeline stage",
+    ["pipeline", "stage"], buckets=DURATION_BUCKETS,
+)
+LLM_CALL_DURATION = Histogram(
+    "autoui_llm_call_duration_seconds", "Wall time of an LLM call, including rate limiting and retries",
+    ["provider", "outcome"], buckets=DURATION_BUCKETS,
+)
+LLM_PROMPT_CHARS = Histogram(
+    "autoui_llm_prompt_chars", "Characters sent per LLM call", ["provider"], buckets=SIZE_BUCKETS,
+)
+LLM_RESPONSE_CHARS = Histogram(
+    "autoui_llm_response_chars", "Characters received per LLM call", ["provider"], buckets=SIZE_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "autoui_llm_tokens", "Tokens per LLM call, as reported by the provider",
+    ["provider", "kind"], buckets=SIZE_BUCKETS,
+)
+LLM_RETRIES = Histogram(
+    "autoui_llm_call_retries", "Retries needed per LLM call", ["provider"], buckets=(0, 1, 2, 3, 4, 6, 8),
+)
+PROMPT_TOKENS = Histogram(
+    "autoui_prompt_tokens", "Tokens in each built agent prompt", ["agent"], buckets=SIZE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "autoui_cache_lookups_total", "SemanticCache lookups by namespace and result (exact, semantic, miss)",
+    ["namespace", "result"],
+)
+CACHE_LOOKUP_DURATION = Histogram(
+    "autoui_cache_lookup_duration_seconds", "SemanticCache lookup latency", ["namespace"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "autoui_single_flight_calls_total",
+    "Coalesced requests by role: leader (computed), joined (same worker), remote (another worker's result)",
+    ["name", "role"],
+)
+
+
+def cache_namespace_label(namespace):
+    """Component namespaces are per theme; collapse them to keep label cardinality bounded."""
+    return "component" if namespace.startswith("component_") else namespace
+
+
+def observe_stage(pipeline, stage, stage_start, **data):
+    """Record a stage's wall time and build its progress event payload."""
+    elapsed = time.perf_counter() - stage_start
+    STAGE_DURATION.labels(pipeline, stage).observe(elapsed)
+    return {"stage": stage, "elapsed": round(elapsed, 3), **data}
+
+
+def observe_llm_call(provider, messages, response, elapsed, retries, outcome):
+    """Record one LLM call: latency, prompt/response size, token usage and retries."""
+    LLM_CALL_DURATION.labels(provider, outcome).observe(elapsed)
+    LLM_RETRIES.labels(provider).observe(retries)
+    LLM_PROMPT_CHARS.labels(provider).observe(sum(len(str(message.content)) for message in messages))
+    if response is None:
+        return
+    LLM_RESPONSE_CHARS.labels(provider).observe(len(str(response.content)))
+    usage = getattr(response, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(provider, kind.split("_")[0]).observe(usage[kind])
+
+
+def observe_cache_lookup(namespace, result, lookup_start):
+    label = cache_namespace_label(namespace)
+    CACHE_LOOKUPS.labels(label, result).inc()
+    CACHE_LOOKUP_DURATION.labels(label).observe(time.perf_counter() - lookup_start)
+
+
+def observe_single_flight(name, role):
+    SINGLE_FLIGHT_CALLS.labels(name, role).inc()
+
+
+def metrics_payload():
+    """Prometheus text exposition, aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
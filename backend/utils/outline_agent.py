@@ -1,6 +1,7 @@
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from pydantic import BaseModel, Field, RootModel
-from utils.call_ai import call_ai
+from utils.call_ai import call_ai, call_ai_async
+from utils.prompt_utils import report_prompt, format_instructions
 
 
 class Section(BaseModel):
@@ -11,21 +12,28 @@ class Outline(RootModel[list[Section]]):
     pass
 
 parser = PydanticOutputParser(pydantic_object=Outline)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
 
-def generate_outline(topic):
-    prompt = f"""
+def build_outline_prompt(topic):
+    return report_prompt("outline", f"""
 Create a detailed website outline for the topic: "{topic}"
 
 Return ONLY valid JSON array.
 Do not include extra text.
 
-{parser.get_format_instructions()}
-"""
+{FORMAT_INSTRUCTIONS}
+""")
 
-    response = call_ai([{"content": prompt}])
+def generate_outline(topic):
+    response = call_ai([{"content": build_outline_prompt(topic)}])
     parsed = parser.parse(response)
     return parsed.model_dump()  # use model_dump() in Pydantic v2
 
+async def generate_outline_async(topic):
+    response = await call_ai_async([{"content": build_outline_prompt(topic)}])
+    parsed = parser.parse(response)
+    return parsed.model_dump()
+
 
 if __name__ == "__main__":
     topic = "Health and Wellness Blog"
@@ -0,0 +1,274 @@
+import os
+import time
+import asyncio
+from utils.outline_agent import generate_outline_async
+from utils.designer_agent import generate_design_async, DesignRecommendations
+from utils.project_manager_agent import manage_project_async, ProjectPlan
+from utils.planner_agent import plan_website_async
+from utils.component_specs_agent import generate_component_specs_async
+from utils.plan_specs_agent import plan_website_with_specs_async
+from utils.component_gen_agent import iter_full_next_app, merge_file_groups, scaffold_reference, GeneratedApp
+from utils.stage_cache import cached_stage, stage_cache_key, exact_cache_key
+from utils.metrics import observe_stage
+
+
+PIPELINE_STAGES = ["outline", "designer", "project_manager", "planner", "component_specs", "components"]
+
+# "parallel" takes the PM call off the critical path; "sequential" gives the PM the design as context;
+# "fast" is parallel plus a single fused plan+specs call instead of planner then component specs
+PIPELINE_PROFILES = ("sequential", "parallel", "fast")
+PIPELINE_PROFILE = os.environ.get("PIPELINE_PROFILE", "parallel")
+
+
+def outline_to_data(outline):
+    """Convert request Outline models to plain dicts."""
+    if outline and hasattr(outline[0], 'model_dump'):
+        return [item.model_dump() for item in outline]
+    return outline
+
+
+def planner_stage_key(user_requirement, outline, design_recommendations=None, project_plan=None):
+    """Stage cache key for the planner: outline plus the design and PM inputs it depends on."""
+    return exact_cache_key(
+        user_requirement,
+        outline,
+        design_recommendations.theme if design_recommendations else None,
+        {"complexity": project_plan.scope.complexity, "pages": project_plan.recommendedPages} if project_plan else None,
+    )
+
+
+async def design_stage(cache, user_requirement, outline):
+    """Designer agent (Gemini); None if it fails, the pipeline continues without design input."""
+    print("🎨 Designer agent generating design recommendations...")
+    try:
+        design_recommendations = await cached_stage(
+            cache, "designer", exact_cache_key(user_requirement, outline),
+            lambda: generate_design_async(user_requirement, outline),
+            dump=lambda design: design.model_dump(),
+            load=DesignRecommendations.model_validate,
+        )
+        print(f"✓ Design theme: {design_recommendations.theme.mode} mode, {design_recommendations.theme.primaryColor} primary")
+        return design_recommendations
+    except Exception as e:
+        print(f"⚠ Designer agent error: {e}, continuing without design recommendations")
+        return None
+
+
+async def project_manager_stage(cache, user_requirement, outline, design_recommendations=None):
+    """Project manager agent (Gemini); None if it fails, the pipeline continues without PM input."""
+    print("📋 Project manager scoping project...")
+    try:
+        design_theme = design_recommendations.theme if design_recommendations else None
+        project_plan = await cached_stage(
+            cache, "project_manager", exact_cache_key(user_requirement, outline, design_theme),
+            lambda: manage_project_async(user_requirement, outline, design_recommendations),
+            dump=lambda plan: plan.model_dump(),
+            load=ProjectPlan.model_validate,
+        )
+        print(f"✓ Project complexity: {project_plan.scope.complexity}")
+        return project_plan
+    except Exception as e:
+        print(f"⚠ Project manager error: {e}, continuing without PM recommendations")
+        return None
+
+
+async def run_pipeline(outline=None, topic=None, cache=None, inline_scaffold=True, store=None, profile=None):
+    """
+    Run the full outline → designer → PM → planner → specs → components chain,
+    yielding progress events as each stage completes.
+
+    Args:
+        outline: Optional user-provided outline (list of sections)
+        topic: Optional topic string, used to generate the outline when none is given
+        cache: Optional SemanticCache; every LLM stage is looked up in its own namespace
+        inline_scaffold: Include the static scaffold files; when False the result
+            refers to the shared bundle served from /scaffold/{hash}
+        store: Optional GenerationStore; the run's artifacts are kept there and the
+            result carries a generationId that /generate-code/regenerate accepts
+        profile: "sequential" runs the PM with the design as context; "parallel"
+            runs designer and PM concurrently; "fast" also fuses planner and
+            component specs into one call (defaults to PIPELINE_PROFILE)
+
+    Yields (event, data) tuples:
+        ("start", {"stages": [...]}) listing the stages this run will go through
+        ("stages", {"stages": [...]}) with the revised list if the fast profile falls back
+        ("stage", {"stage": ..., "elapsed": ..., ...}) when a stage completes
+        ("component", {"files": {...}}) as soon as each component's code is complete
+        ("files", {"group": ..., "files": {...}}) for the scaffold and each page
+        ("done", {"files": {...}}) with the complete generated app
+    """
+    started = time.perf_counter()
+    profile = profile or PIPELINE_PROFILE
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile {profile!r}, expected one of {PIPELINE_PROFILES}")
+    stages = PIPELINE_STAGES if not outline else PIPELINE_STAGES[1:]
+    if profile == "fast":
+        stages = [stage for stage in stages if stage not in ("planner", "component_specs")]
+        stages.insert(stages.index("components"), "plan_specs")
+    yield "start", {"stages": stages}
+
+    # Get outline - either from request or generate from topic
+    if outline:
+        user_requirement = "User-provided outline"
+    else:
+        user_requirement = topic
+        stage_start = time.perf_counter()
+        outline = await cached_stage(
+            cache, "outline", stage_cache_key(topic),
+            lambda: generate_outline_async(topic),
+        )
+        yield "stage", observe_stage(
+            "generate", "outline", stage_start,
+            outline=outline,
+        )
+
+    outline = outline_to_data(outline)
+
+    if profile in ("parallel", "fast"):
+        # Steps 1-2 concurrently: PM scopes from the outline alone and the planner reconciles both
+        print("🎨📋 Designer and project manager agents running in parallel...")
+        stage_start = time.perf_counter()
+
+        async def labelled(stage, coro):
+            return stage, await coro
+
+        results = {}
+        tasks = [
+            asyncio.create_task(labelled("designer", design_stage(cache, user_requirement, outline))),
+            asyncio.create_task(labelled("project_manager", project_manager_stage(cache, user_requirement, outline))),
+        ]
+        try:
+            for next_stage in asyncio.as_completed(tasks):
+                stage, result = await next_stage
+                results[stage] = result
+                yield "stage", observe_stage(
+                    "generate", stage, stage_start,
+                    ok=result is not None,
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
+        design_recommendations, project_plan = results["designer"], results["project_manager"]
+    else:
+        # Step 1: Designer Agent (using Gemini)
+        stage_start = time.perf_counter()
+        design_recommendations = await design_stage(cache, user_requirement, outline)
+        yield "stage", observe_stage(
+            "generate", "designer", stage_start,
+            ok=design_recommendations is not None,
+        )
+
+        # Step 2: Project Manager Agent (using Gemini), with the design as context
+        stage_start = time.perf_counter()
+        project_plan = await project_manager_stage(cache, user_requirement, outline, design_recommendations)
+        yield "stage", observe_stage(
+            "generate", "project_manager", stage_start,
+            ok=project_plan is not None,
+        )
+
+    planner_key = planner_stage_key(user_requirement, outline, design_recommendations, project_plan)
+    fused = None
+    if profile == "fast":
+        # Steps 3-4 fused: one Groq call returns both the plan and its component specs
+        print("📐 Plan+specs agent planning pages and component specs...")
+        stage_start = time.perf_counter()
+        try:
+            fused = await cached_stage(
+                cache, "plan_specs", planner_key,
+                lambda: plan_website_with_specs_async(outline, design_recommendations, project_plan, user_requirement),
+                dump=lambda plan: {"theme": plan[0], "pages": plan[1], "componentSpecs": plan[2]},
+                load=lambda data: (data["theme"], data["pages"], data["componentSpecs"]),
+            )
+        except Exception as e:
+            print(f"⚠ Plan+specs agent error: {e}, falling back to separate planner and spec stages")
+            # Announce the fallback stages before they run, so progress tracking knows about them
+            split = stages.index("components")
+            stages = [*stages[:split], "planner", "component_specs", *stages[split:]]
+            yield "stages", {"stages": stages}
+        yield "stage", observe_stage(
+            "generate", "plan_specs", stage_start,
+            ok=fused is not None,
+            pages=[page["route"] for page in fused[1]] if fused else [],
+            components=sum(len(comps) for comps in fused[2].values()) if fused else 0,
+        )
+
+    if fused:
+        theme, pages, components_spec = fused
+    else:
+        # Step 3: Planner Agent (integrates all inputs, uses Groq)
+        print("📐 Planner agent creating final plan...")
+        stage_start = time.perf_counter()
+        theme, pages = await cached_stage(
+            cache, "planner", planner_key,
+            lambda: plan_website_async(outline, design_recommendations, project_plan, user_requirement),
+            dump=lambda plan: {"theme": plan[0], "pages": plan[1]},
+            load=lambda data: (data["theme"], data["pages"]),
+        )
+        print("Planned website structure: ", {"theme": theme, "pages": len(pages)})
+        yield "stage", observe_stage(
+            "generate", "planner", stage_start,
+            theme=theme,
+            pages=[page["route"] for page in pages],
+        )
+
+        # Step 4: Component Specs
+        stage_start = time.perf_counter()
+        planned_structure = {"theme": theme, "pages": pages}
+        components_spec = await cached_stage(
+            cache, "component_specs", exact_cache_key(planned_structure),
+            lambda: generate_component_specs_async(planned_structure),
+        )
+        print("Generated component specs")
+        yield "stage", observe_stage(
+            "generate", "component_specs", stage_start,
+            components=sum(len(comps) for comps in components_spec.values()),
+        )
+
+    # Step 5: Generate Full App, streaming each page as soon as it is ready
+    stage_start = time.perf_counter()
+    groups = {}
+    async for group, group_files in iter_full_next_app(
+        components_spec, theme, cache=cache, inline_scaffold=inline_scaffold, stream_components=True
+    ):
+        if group == "component":
+            yield "component", {"files": group_files}
+            continue
+        groups[group] = group_files
+        yield "files", {"group": group, "files": group_files}
+    files = merge_file_groups(groups, components_spec)
+    print("✓ All components and pages generated")
+    yield "stage", observe_stage(
+        "generate", "components", stage_start,
+        files=len(files),
+    )
+
+    generation_id = None
+    if store is not None:
+        generation_id = await asyncio.to_thread(store.save, {
+            "userRequirement": user_requirement,
+            "outline": outline,
+            "design": design_recommendations.model_dump() if design_recommendations else None,
+            "projectPlan": project_plan.model_dump() if project_plan else None,
+            "theme": theme,
+            "pages": pages,
+            "componentSpecs": components_spec,
+            "files": files,
+        })
+
+    print(f"Pipeline finished in {time.perf_counter() - started:.2f}s")
+    yield "done", GeneratedApp(
+        files=files,
+        scaffold=None if inline_scaffold else scaffold_reference(),
+        generationId=generation_id,
+    ).model_dump(exclude_none=True)
+
+
+async def generate_app(outline=None, topic=None, cache=None, inline_scaffold=True, store=None, profile=None):
+    """Run the pipeline to completion and return the generated app."""
+    result = None
+    async for event, data in run_pipeline(
+        outline, topic, cache=cache, inline_scaffold=inline_scaffold, store=store, profile=profile
+    ):
+        if event == "done":
+            result = data
+    return result
@@ -0,0 +1,98 @@
+from langchain_core.output_parsers.pydantic import PydanticOutputParser
+from pydantic import BaseModel, Field
+from utils.call_ai import call_ai, call_ai_async
+from utils.planner_agent import Theme, Page, build_planner_context, apply_design_theme
+from utils.component_specs_agent import ComponentSpec
+from utils.prompt_utils import compact_json, outline_data, report_prompt, format_instructions
+
+
+class PlanWithSpecs(BaseModel):
+    theme: Theme = Field(...)
+    pages: list[Page] = Field(...)
+    componentSpecs: dict[str, dict[str, ComponentSpec]] = Field(
+        ..., description="Maps each page route to its section IDs and their component specs"
+    )
+
+
+parser = PydanticOutputParser(pydantic_object=PlanWithSpecs)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
+
+
+def build_plan_specs_prompt(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """Build the fused planner + component spec prompt."""
+    user_context, design_context, pm_context = build_planner_context(design_recommendations, project_plan, user_requirement)
+
+    prompt = f"""
+You are a senior planning agent for an agentic frontend code generation system similar to v0.dev.
+You plan the website and specify its components in one step.
+{user_context}
+You will receive a JSON array representing a website outline. Each item contains:
+- sectionName
+- description
+{design_context}
+{pm_context}
+Planning responsibilities:
+1) Normalize section names (clear, concise, Title Case)
+2) Finalize a single global design theme (incorporate design recommendations if provided)
+3) Decide the required routes/pages (consider PM recommendations if provided)
+4) Assign each section to an appropriate page, with a kebab-case id
+5) Classify each section as layout, section or component
+6) Define dependencies between sections when required
+
+Component spec responsibilities, for every section of every page:
+- componentSpecs[route][section id] must exist for each planned section, using the same id
+- name: human-readable name
+- type: layout, section, or component
+- props: array of props it should receive
+- state: what internal state it may have (empty object if none)
+- libraries: any npm packages or UI libs required
+- usage: guidelines or description of purpose
+
+Strict rules:
+- Be deterministic and consistent
+- Do not invent extra sections beyond the outline
+- Prefer minimal routes (combine sections when reasonable)
+- Recommend only commonly used frontend libraries
+
+Input outline:
+{compact_json(outline_data(outline))}
+
+Return ONLY valid JSON.
+Do not include extra text.
+
+{FORMAT_INSTRUCTIONS}
+"""
+    return report_prompt("plan_specs", prompt)
+
+
+def parse_plan_specs(response, design_recommendations=None):
+    """
+    Parse the fused response into (theme, pages, component_specs), the same shapes
+    plan_website and generate_component_specs return.
+    """
+    result = parser.parse(response).model_dump()
+    theme = apply_design_theme(result["theme"], design_recommendations)
+    pages = result["pages"]
+    component_specs = result["componentSpecs"]
+
+    missing = [page["route"] for page in pages if not component_specs.get(page["route"])]
+    if missing:
+        raise ValueError(f"Plan+specs response has no component specs for pages: {', '.join(missing)}")
+
+    # Keep specs in page order and drop any for routes that weren't planned
+    component_specs = {page["route"]: component_specs[page["route"]] for page in pages}
+    return theme, pages, component_specs
+
+
+def plan_website_with_specs(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """Plan the website and generate its component specs in a single LLM call."""
+    prompt = build_plan_specs_prompt(outline, design_recommendations, project_plan, user_requirement)
+    response = call_ai([{"content": prompt}])
+    return parse_plan_specs(response, design_recommendations)
+
+
+async def plan_website_with_specs_async(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """Async version of plan_website_with_specs that doesn't block the event loop."""
+    prompt = build_plan_specs_prompt(outline, design_recommendations, project_plan, user_requirement)
+    response = await call_ai_async([{"content": prompt}])
+    return parse_plan_specs(response, design_recommendations)
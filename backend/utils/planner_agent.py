@@ -1,8 +1,8 @@
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
-from utils.call_ai import call_ai
-import json
+from utils.call_ai import call_ai, call_ai_async
+from utils.prompt_utils import compact_json, outline_data, report_prompt, format_instructions
 
 
 class Theme(BaseModel):
@@ -31,23 +31,11 @@ class WebsitePlan(BaseModel):
 
 
 parser = PydanticOutputParser(pydantic_object=WebsitePlan)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
 
 
-def plan_website(outline, design_recommendations=None, project_plan=None, user_requirement=None):
-    """
-    Plan website structure, integrating inputs from designer and project manager agents.
-    
-    Args:
-        outline: Website outline from outline agent
-        design_recommendations: Optional design recommendations from designer agent
-        project_plan: Optional project plan from project manager agent
-        user_requirement: Optional original user requirement for context
-    """
-    # Convert Pydantic models to dictionaries if needed
-    outline_data = outline
-    if hasattr(outline, '__iter__') and outline and hasattr(outline[0], 'model_dump'):
-        outline_data = [item.model_dump() for item in outline]
-
+def build_planner_context(design_recommendations=None, project_plan=None, user_requirement=None):
+    """Context blocks from the upstream agents: (user_context, design_context, pm_context)."""
     # Build context from other agents
     design_context = ""
     if design_recommendations:
@@ -75,7 +63,7 @@ PROJECT MANAGEMENT RECOMMENDATIONS (from Project Manager Agent):
 - Complexity: {project_plan.scope.complexity}
 - Priority Features: {', '.join(project_plan.scope.priorityFeatures)}
 - Recommended Pages: {', '.join(project_plan.recommendedPages)}
-- Component Priorities: {json.dumps(project_plan.componentPriorities, indent=2)}
+- Component Priorities: {compact_json(project_plan.componentPriorities)}
 
 IMPORTANT: Consider these recommendations when structuring pages and prioritizing components.
 """
@@ -84,6 +72,13 @@ IMPORTANT: Consider these recommendations when structuring pages and prioritizin
     if user_requirement:
         user_context = f"\nOriginal User Requirement: \"{user_requirement}\"\n"
 
+    return user_context, design_context, pm_context
+
+
+def build_planner_prompt(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """Build the planner prompt, integrating designer and project manager context."""
+    user_context, design_context, pm_context = build_planner_context(design_recommendations, project_plan, user_requirement)
+
     prompt = f"""
 You are a senior planning agent for an agentic frontend code generation system similar to v0.dev.
 {user_context}
@@ -112,27 +107,55 @@ Strict rules:
 - If PM recommendations are provided, prioritize accordingly
 
 Input outline:
-{json.dumps(outline_data, indent=2)}
+{compact_json(outline_data(outline))}
 
 Return ONLY valid JSON.
 Do not include extra text.
 
-{parser.get_format_instructions()}
+{FORMAT_INSTRUCTIONS}
 """
+    return report_prompt("planner", prompt)
 
-    response = call_ai([{"content": prompt}])
+
+def parse_plan(response, design_recommendations=None):
+    """Parse the planner response and merge in the designer's theme choices."""
     parsed = parser.parse(response)
     result = parsed.model_dump()
-    
-    # Merge design theme if available
+    apply_design_theme(result["theme"], design_recommendations)
+    return result.get("theme"), result.get("pages")
+
+
+def apply_design_theme(theme, design_recommendations=None):
+    """Merge the designer's theme choices into a planned theme, in place."""
     if design_recommendations:
         design_theme = design_recommendations.theme
-        result["theme"]["mode"] = design_theme.mode
-        result["theme"]["primaryColor"] = design_theme.primaryColor
-        result["theme"]["radius"] = design_theme.radius
-        result["theme"]["spacing"] = design_theme.spacing
+        theme["mode"] = design_theme.mode
+        theme["primaryColor"] = design_theme.primaryColor
+        theme["radius"] = design_theme.radius
+        theme["spacing"] = design_theme.spacing
+    return theme
+
+
+def plan_website(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """
+    Plan website structure, integrating inputs from designer and project manager agents.
     
-    return result.get("theme"), result.get("pages")
+    Args:
+        outline: Website outline from outline agent
+        design_recommendations: Optional design recommendations from designer agent
+        project_plan: Optional project plan from project manager agent
+        user_requirement: Optional original user requirement for context
+    """
+    prompt = build_planner_prompt(outline, design_recommendations, project_plan, user_requirement)
+    response = call_ai([{"content": prompt}])
+    return parse_plan(response, design_recommendations)
+
+
+async def plan_website_async(outline, design_recommendations=None, project_plan=None, user_requirement=None):
+    """Async version of plan_website that doesn't block the event loop."""
+    prompt = build_planner_prompt(outline, design_recommendations, project_plan, user_requirement)
+    response = await call_ai_async([{"content": prompt}])
+    return parse_plan(response, design_recommendations)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,8 @@
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import Literal
-from utils.call_gemini import call_gemini
-import json
+from utils.call_gemini import call_gemini, call_gemini_async
+from utils.prompt_utils import compact_json, outline_data, report_prompt, format_instructions
 
 
 class ProjectScope(BaseModel):
@@ -22,37 +22,27 @@ class ProjectPlan(BaseModel):
 
 
 parser = PydanticOutputParser(pydantic_object=ProjectPlan)
+FORMAT_INSTRUCTIONS = format_instructions(parser)
 
+PROJECT_MANAGER_SYSTEM_PROMPT = "You are an expert project manager. Always respond with valid JSON matching the requested schema."
 
-def manage_project(user_requirement, outline=None, design_recommendations=None):
-    """
-    Act as project manager to scope and plan the project using Gemini.
-    
-    Args:
-        user_requirement: User's original prompt/requirement
-        outline: Optional outline data
-        design_recommendations: Optional design recommendations from designer agent
-    
-    Returns:
-        ProjectPlan object
-    """
+
+def build_project_prompt(user_requirement, outline=None, design_recommendations=None):
+    """Build the project manager prompt from the requirement, outline and design."""
     outline_context = ""
     if outline:
-        outline_data = outline
-        if hasattr(outline, '__iter__') and outline and hasattr(outline[0], 'model_dump'):
-            outline_data = [item.model_dump() for item in outline]
         outline_context = f"""
 Initial Outline:
-{json.dumps(outline_data, indent=2)}
+{compact_json(outline_data(outline))}
 """
     
     design_context = ""
     if design_recommendations:
         design_context = f"""
 Design Recommendations:
-- Theme: {design_recommendations.theme.model_dump()}
-- Principles: {design_recommendations.designPrinciples}
-- Patterns: {design_recommendations.modernPatterns}
+- Theme: {compact_json(design_recommendations.theme.model_dump())}
+- Principles: {', '.join(design_recommendations.designPrinciples)}
+- Patterns: {', '.join(design_recommendations.modernPatterns)}
 """
     
     prompt = f"""You are an expert project manager for web development projects.
@@ -82,20 +72,44 @@ Focus on creating a realistic, achievable plan that balances:
 - Technical constraints
 - Development efficiency
 
-{parser.get_format_instructions()}
+{FORMAT_INSTRUCTIONS}
 
 Return ONLY valid JSON matching the schema above.
 """
+    return report_prompt("project_manager", prompt)
+
+
+def manage_project(user_requirement, outline=None, design_recommendations=None):
+    """
+    Act as project manager to scope and plan the project using Gemini.
+    
+    Args:
+        user_requirement: User's original prompt/requirement
+        outline: Optional outline data
+        design_recommendations: Optional design recommendations from designer agent
     
+    Returns:
+        ProjectPlan object
+    """
     response = call_gemini(
-        [{"content": prompt}],
-        system_prompt="You are an expert project manager. Always respond with valid JSON matching the requested schema."
+        [{"content": build_project_prompt(user_requirement, outline, design_recommendations)}],
+        system_prompt=PROJECT_MANAGER_SYSTEM_PROMPT
     )
     
     parsed = parser.parse(response)
     return parsed
 
 
+async def manage_project_async(user_requirement, outline=None, design_recommendations=None):
+    """Async version of manage_project that doesn't block the event loop."""
+    response = await call_gemini_async(
+        [{"content": build_project_prompt(user_requirement, outline, design_recommendations)}],
+        system_prompt=PROJECT_MANAGER_SYSTEM_PROMPT
+    )
+    
+    return parser.parse(response)
+
+
 if __name__ == "__main__":
     requirement = "A modern SaaS dashboard for project management"
     plan = manage_project(requirement)
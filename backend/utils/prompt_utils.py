@@ -0,0 +1,83 @@
+import json
+import math
+from utils.metrics import PROMPT_TOKENS
+
+# tiktoken is optional; without it token counts are a chars/4 estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def compact_json(data):
+    """JSON without indentation or padding spaces; indentation alone is a large share of prompt tokens."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def outline_data(outline):
+    """Outline as plain {sectionName, description} dicts with surrounding whitespace stripped."""
+    if outline and hasattr(outline[0], 'model_dump'):
+        outline = [item.model_dump() for item in outline]
+    return [
+        {"sectionName": str(section["sectionName"]).strip(), "description": str(section.get("description", "")).strip()}
+        for section in outline or []
+    ]
+
+
+def compact_planned_structure(planned_structure):
+    """Planner output trimmed to what the spec agent uses: no empty dependency lists."""
+    pages = [
+        {
+            "route": page["route"],
+            "title": page.get("title"),
+            "sections": [
+                {key: value for key, value in section.items() if not (key == "dependencies" and not value)}
+                for section in page["sections"]
+            ],
+        }
+        for page in planned_structure.get("pages", [])
+    ]
+    return {"theme": planned_structure.get("theme"), "pages": pages}
+
+
+def compact_spec(spec):
+    """Component spec without empty props, state or libraries."""
+    return {key: value for key, value in spec.items() if value not in ([], {}, "", None)}
+
+
+def strip_titles(schema):
+    """Drop the auto-generated "title" keys (not property names called title) from a JSON schema."""
+    if isinstance(schema, dict):
+        return {
+            key: (strip_titles(value) if key != "properties" else {name: strip_titles(prop) for name, prop in value.items()})
+            for key, value in schema.items()
+            if key != "title" or not isinstance(value, str)
+        }
+    if isinstance(schema, list):
+        return [strip_titles(item) for item in schema]
+    return schema
+
+
+def format_instructions(parser):
+    """
+    Compact equivalent of parser.get_format_instructions(): the model's JSON schema
+    without titles or the worked example, serialized compactly. Build it once per
+    parser at import time; the parser still validates responses as before.
+    """
+    schema = strip_titles(parser.pydantic_object.model_json_schema())
+    return f"The output must be a JSON instance conforming to this JSON schema:\n```\n{compact_json(schema)}\n```"
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def report_prompt(agent, prompt):
+    """Record the prompt's token count for the agent and return the prompt unchanged."""
+    tokens = count_tokens(prompt)
+    PROMPT_TOKENS.labels(agent).observe(tokens)
+    print(f"{agent} prompt: {tokens} tokens, {len(prompt)} chars")
+    return prompt
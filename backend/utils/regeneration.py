@@ -0,0 +1,276 @@
+import re
+import time
+import asyncio
+from classes.artifact_store import ArtifactStore
+from utils.designer_agent import DesignRecommendations
+from utils.project_manager_agent import ProjectPlan
+from utils.planner_agent import plan_website_async
+from utils.component_specs_agent import generate_component_specs_async
+from utils.component_gen_agent import (
+    regenerate_page_files, generate_config_files, generate_root_layout, merge_file_groups,
+    scaffold_reference, GeneratedApp, PAGE_GENERATION_CONCURRENCY,
+)
+from utils.component_cache import normalize_text, THEME_FIELDS
+from utils.pipeline import outline_to_data, planner_stage_key
+from utils.stage_cache import cached_stage, exact_cache_key
+from utils.metrics import observe_stage
+
+
+def section_key(name):
+    """Match key for outline and plan sections: "Hero Area", "hero-area" and "hero_area" are the same."""
+    return re.sub(r"[^a-z0-9]", "", str(name or "").lower())
+
+
+def diff_outline(old_outline, new_outline):
+    """
+    Compare two outlines section by section (matched on sectionName).
+
+    Returns {"added": [...], "removed": [...], "changed": [...]} with the
+    new sections for added/changed and the old ones for removed.
+    """
+    old = {section_key(section["sectionName"]): section for section in old_outline or []}
+    new = {section_key(section["sectionName"]): section for section in new_outline or []}
+    return {
+        "added": [section for key, section in new.items() if key not in old],
+        "removed": [section for key, section in old.items() if key not in new],
+        "changed": [
+            section for key, section in new.items()
+            if key in old and normalize_text(section.get("description")) != normalize_text(old[key].get("description"))
+        ],
+    }
+
+
+def find_plan_sections(pages, section_names):
+    """
+    Locate outline sections in a website plan.
+
+    Returns (matches, unmatched): matches maps page routes to the IDs of the
+    plan sections that correspond to section_names, unmatched lists the
+    names that could not be found in any page.
+    """
+    wanted = {section_key(name): name for name in section_names}
+    matches, found = {}, set()
+    for page in pages:
+        for section in page["sections"]:
+            for key in (section_key(section["sectionName"]), section_key(section["id"])):
+                if key in wanted:
+                    matches.setdefault(page["route"], set()).add(section["id"])
+                    found.add(key)
+    return matches, [name for key, name in wanted.items() if key not in found]
+
+
+def theme_changed(old_theme, new_theme):
+    """Whether the theme fields that reach the component prompts differ."""
+    old_theme, new_theme = old_theme or {}, new_theme or {}
+    return any(
+        normalize_text(old_theme.get(field)) != normalize_text(new_theme.get(field))
+        for field in THEME_FIELDS
+    )
+
+
+def with_description(section, outline):
+    """A plan section with the description of its outline section, when there is one."""
+    descriptions = {section_key(item["sectionName"]): item.get("description") for item in outline or []}
+    description = descriptions.get(section_key(section["sectionName"])) or descriptions.get(section_key(section["id"]))
+    return {**section, "description": description} if description else section
+
+
+def attach_descriptions(specs, pages):
+    """Copy section descriptions onto their component specs, for the component prompt and cache key."""
+    descriptions = {
+        (page["route"], section["id"]): section["description"]
+        for page in pages for section in page["sections"] if section.get("description")
+    }
+    return {
+        route: {
+            comp_id: {**spec, "description": descriptions[(route, comp_id)]} if (route, comp_id) in descriptions else spec
+            for comp_id, spec in page_specs.items()
+        }
+        for route, page_specs in specs.items()
+    }
+
+
+def merge_page_specs(section_ids, old_specs, fresh_specs, stale_ids):
+    """Component specs for a page: fresh specs for stale sections, previous specs for the rest, in page order."""
+    merged = {}
+    for comp_id in section_ids:
+        if comp_id in fresh_specs:
+            merged[comp_id] = fresh_specs[comp_id]
+        elif comp_id in old_specs and comp_id not in stale_ids:
+            merged[comp_id] = old_specs[comp_id]
+    for comp_id, spec in fresh_specs.items():
+        merged.setdefault(comp_id, spec)
+    return merged
+
+
+async def run_regeneration(previous, outline, cache=None, inline_scaffold=True, store=None):
+    """
+    Regenerate a stored generation after the user edited its outline.
+
+    Only sections whose description changed are re-specced and re-generated.
+    Adding or removing sections re-runs the planner (with the stored design and
+    PM output, which are not regenerated); pages and components that survive
+    the new plan unchanged keep their previous specs and files.
+
+    Args:
+        previous: Generation record from GenerationStore
+        outline: The edited outline (list of sections)
+        cache: Optional SemanticCache used for the planner, specs and components
+        inline_scaffold: Include the static scaffold files in the result
+        store: Optional GenerationStore the new generation is saved to; reused
+            files are read from its ArtifactStore (the one from ARTIFACT_STORE_DIR without it)
+
+    Yields the same (event, data) tuples as run_pipeline.
+    """
+    started = time.perf_counter()
+    artifacts = store.artifacts if store is not None else ArtifactStore.fromEnv()
+    outline = outline_to_data(outline)
+    theme, pages = previous["theme"], previous["pages"]
+    old_specs = previous["componentSpecs"]
+
+    diff = diff_outline(previous["outline"], outline)
+    changed_names = [section["sectionName"] for section in diff["changed"]]
+    stale, unmatched = find_plan_sections(pages, changed_names)
+    replan = bool(diff["added"] or diff["removed"] or unmatched)
+    print(
+        f"Outline diff: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+        f"{len(diff['changed'])} changed, replan={replan}"
+    )
+
+    stages = ["diff", "planner", "component_specs", "components"] if replan else ["diff", "component_specs", "components"]
+    yield "start", {"stages": stages}
+    yield "stage", observe_stage(
+        "regenerate", "diff", started,
+        added=[section["sectionName"] for section in diff["added"]],
+        removed=[section["sectionName"] for section in diff["removed"]],
+        changed=changed_names,
+    )
+
+    if replan:
+        print("📐 Outline structure changed, re-running planner...")
+        stage_start = time.perf_counter()
+        user_requirement = previous["userRequirement"]
+        design_recommendations = DesignRecommendations.model_validate(previous["design"]) if previous["design"] else None
+        project_plan = ProjectPlan.model_validate(previous["projectPlan"]) if previous["projectPlan"] else None
+        theme, pages = await cached_stage(
+            cache, "planner", planner_stage_key(user_requirement, outline, design_recommendations, project_plan),
+            lambda: plan_website_async(outline, design_recommendations, project_plan, user_requirement),
+            dump=lambda plan: {"theme": plan[0], "pages": plan[1]},
+            load=lambda data: (data["theme"], data["pages"]),
+        )
+        yield "stage", observe_stage(
+            "regenerate", "planner", stage_start,
+            theme=theme,
+            pages=[page["route"] for page in pages],
+        )
+
+        # A new theme reaches every component prompt, so nothing can be reused
+        rebuild_all = theme_changed(previous["theme"], theme)
+        stale, _ = find_plan_sections(pages, changed_names)
+        for page in pages:
+            page_specs = old_specs.get(page["route"], {})
+            for section in page["sections"]:
+                if rebuild_all or section["id"] not in page_specs:
+                    stale.setdefault(page["route"], set()).add(section["id"])
+
+    # Step 1: specs only for the stale sections of affected pages. Plan sections
+    # carry no description, so the edited outline text is attached to them; it
+    # reaches the spec prompt, the spec cache key and (via the specs) the components.
+    stage_start = time.perf_counter()
+    stale_pages = [
+        {
+            **page,
+            "sections": [
+                with_description(section, outline)
+                for section in page["sections"] if section["id"] in stale[page["route"]]
+            ],
+        }
+        for page in pages if stale.get(page["route"])
+    ]
+    fresh_specs = {}
+    if stale_pages:
+        planned_structure = {"theme": theme, "pages": stale_pages}
+        fresh_specs = await cached_stage(
+            cache, "component_specs", exact_cache_key(planned_structure),
+            lambda: generate_component_specs_async(planned_structure),
+        )
+        fresh_specs = attach_descriptions(fresh_specs, stale_pages)
+    components_spec = {
+        page["route"]: merge_page_specs(
+            [section["id"] for section in page["sections"]],
+            old_specs.get(page["route"], {}),
+            fresh_specs.get(page["route"], {}),
+            stale.get(page["route"], set()),
+        )
+        for page in pages
+    }
+    yield "stage", observe_stage(
+        "regenerate", "component_specs", stage_start,
+        components=sum(len(comps) for comps in fresh_specs.values()),
+    )
+
+    # Step 2: rebuild pages, generating only the stale components
+    stage_start = time.perf_counter()
+    scaffold_files = {}
+    if inline_scaffold:
+        generate_config_files(scaffold_files)
+    generate_root_layout(scaffold_files, theme)
+    groups = {"scaffold": scaffold_files}
+    yield "files", {"group": "scaffold", "files": scaffold_files}
+
+    semaphore = asyncio.Semaphore(PAGE_GENERATION_CONCURRENCY)
+
+    async def run_page(page_route, components):
+        async with semaphore:
+            stale_ids = set(fresh_specs.get(page_route, {})) | stale.get(page_route, set())
+            return page_route, await regenerate_page_files(
+                page_route, components, stale_ids, previous["manifest"], artifacts, theme, cache
+            )
+
+    tasks = [
+        asyncio.create_task(run_page(page_route, components))
+        for page_route, components in components_spec.items()
+    ]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            page_route, page_files = await next_page
+            groups[page_route] = page_files
+            yield "files", {"group": page_route, "files": page_files}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    files = merge_file_groups(groups, components_spec)
+    yield "stage", observe_stage(
+        "regenerate", "components", stage_start,
+        files=len(files),
+        regenerated=sum(len(stale_ids) for stale_ids in stale.values()),
+    )
+
+    generation_id = None
+    if store is not None:
+        generation_id = await asyncio.to_thread(store.save, {
+            **previous,
+            "parentId": previous.get("id"),
+            "outline": outline,
+            "theme": theme,
+            "pages": pages,
+            "componentSpecs": components_spec,
+            "files": files,
+        })
+
+    print(f"Regeneration finished in {time.perf_counter() - started:.2f}s")
+    yield "done", GeneratedApp(
+        files=files,
+        scaffold=None if inline_scaffold else scaffold_reference(),
+        generationId=generation_id,
+    ).model_dump(exclude_none=True)
+
+
+async def regenerate_app(previous, outline, cache=None, inline_scaffold=True, store=None):
+    """Run an incremental regeneration to completion and return the generated app."""
+    result = None
+    async for event, data in run_regeneration(previous, outline, cache=cache, inline_scaffold=inline_scaffold, store=store):
+        if event == "done":
+            result = data
+    return result
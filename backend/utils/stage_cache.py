@@ -0,0 +1,80 @@
+import os
+import json
+
+
+# Per-stage cache settings. Only the outline, keyed by a short topic, is matched
+# semantically. The later stages are keyed by whole outlines, themes and plans:
+# the embedding model truncates long inputs and one changed section out of ten
+# barely moves the similarity, so those stages only hit on identical inputs.
+STAGE_CACHE_CONFIG = {
+    "outline": {"threshold": 0.85, "ttl": 7 * 24 * 3600},
+    "designer": {"exactOnly": True, "ttl": 3 * 24 * 3600},
+    "project_manager": {"exactOnly": True, "ttl": 3 * 24 * 3600},
+    "planner": {"exactOnly": True, "ttl": 24 * 3600},
+    "component_specs": {"exactOnly": True, "ttl": 24 * 3600},
+    "plan_specs": {"exactOnly": True, "ttl": 24 * 3600},
+}
+
+STAGE_CACHE_ENABLED = os.environ.get("STAGE_CACHE_ENABLED", "1") == "1"
+
+
+def describe(value):
+    """
+    Flatten nested inputs into plain words for embedding.
+    JSON punctuation would be stripped by SemanticCache.normalizeTopic anyway,
+    gluing keys and values together, so emit space-separated tokens instead.
+    """
+    if value is None:
+        return ""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return " ".join(f"{key} {describe(item)}" for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return " ; ".join(describe(item) for item in value)
+    return str(value)
+
+
+def stage_cache_key(*parts):
+    """Build a stage's cache key from its inputs (topic first, then upstream outputs)."""
+    return " | ".join(describe(part) for part in parts if part)
+
+
+def exact_cache_key(*parts):
+    """Canonical JSON of a stage's inputs, for exact-only stages."""
+    def plain(value):
+        return value.model_dump() if hasattr(value, "model_dump") else str(value)
+    return json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=plain)
+
+
+async def cached_stage(cache, stage, key, generate, dump=None, load=None):
+    """
+    Run a pipeline stage through the semantic cache.
+
+    Args:
+        cache: SemanticCache instance, or None to always generate
+        stage: Stage name; selects the cache namespace, threshold and TTL
+        key: Cache key derived from the stage inputs: stage_cache_key text for
+            semantic stages, exact_cache_key JSON for exact-only ones
+        generate: Coroutine function producing the stage output on a miss
+        dump: Optional function turning the output into JSON-serializable data
+        load: Optional function rebuilding the output from cached data
+    """
+    if cache is None or not STAGE_CACHE_ENABLED:
+        return await generate()
+
+    config = STAGE_CACHE_CONFIG[stage]
+
+    async def generate_data():
+        result = await generate()
+        return dump(result) if dump else result
+
+    data = await cache.getOrGenerateAsync(
+        key,
+        generate_data,
+        threshold=config.get("threshold", 1.0),
+        ttl=config["ttl"],
+        namespace=stage,
+        exactOnly=config.get("exactOnly", False),
+    )
+    return load(data) if load else data